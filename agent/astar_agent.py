@@ -0,0 +1,294 @@
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from agent.base_agent import Agent
+from agent.heuristics import HEURISTICS, goal_rotations
+from ogm.canonical import ROTATIONS, canonical_key
+from ogm.occupancy_grid_map import OccupancyGridMap
+
+
+class TreeCursor:
+    """Walks one map between the nodes of a search tree with apply/revert.
+
+    The map holds the configuration of the node on top of path, reached from
+    the node at its bottom by the moves stored in the tree. goto() reverts up
+    to the lowest ancestor shared with the target and applies the target's
+    moves below it, so consecutive nodes of a best-first search usually cost
+    a pivot or two instead of a set_state. A walk longer than max_walk pivots,
+    or to a node off the path's subtree, jumps with set_state instead and
+    starts a new path there. The stored moves of a node must not change once
+    it has been visited, which holds for expanded nodes of both search modes.
+    """
+
+    def __init__(self, ogm, root_key, max_walk=1):
+        self.ogm = ogm
+        self.max_walk = max_walk
+        self.path = [(root_key, None)]
+        self.depth = {root_key: 0}
+
+    def goto(self, table, key):
+        """Move the map to node key of table: key -> (g, positions, parent key, move)."""
+        chain, target = [], key
+        while key is not None and key not in self.depth:
+            chain.append(key)
+            key = table[key][2]
+        if key is None or len(chain) + len(self.path) - 1 - self.depth[key] > self.max_walk:
+            self.ogm.set_state(table[target][1])
+            self.path = [(target, None)]
+            self.depth = {target: 0}
+            return
+        while len(self.path) > self.depth[key] + 1:
+            dropped, token = self.path.pop()
+            del self.depth[dropped]
+            self.ogm.revert(token)
+        for key in reversed(chain):
+            self.path.append((key, self.ogm.apply(*table[key][3])))
+            self.depth[key] = len(self.path) - 1
+
+
+# modules per pivot a tree walk may take instead of one set_state on a sparse map
+WALK_MODULES = 25
+
+
+class AStarAgent(Agent):
+    """Best-first search over OccupancyGridMap configurations.
+
+    Nodes are ranked by g + weight * h. With weight=1 and an admissible
+    heuristic the plan is optimal, with weight > 1 it is at most weight times
+    longer than optimal. States are deduplicated in a transposition table keyed
+    by the canonical configuration key, so rotated or translated copies of a
+    configuration are expanded only once.
+
+    mode="bidirectional" instead grows breadth-first layers from the start and
+    from the goal, always expanding the smaller frontier, and stops at the first
+    layer where they meet. Pivots are reversible, so the goal side uses the
+    same move generator and its half of the path is replayed backwards.
+    max_states caps the number of stored configurations in either mode.
+
+    Each side searches on its own sparse copy of the map, which a TreeCursor
+    walks from node to node, so the caller's map is never touched. A sparse
+    set_state costs about as much as n / WALK_MODULES pivots, so walks are
+    capped there.
+    """
+
+    def __init__(self, heuristic="combined", weight=1.0, max_nodes=100000, time_limit=None,
+                 mode="forward", max_states=None):
+        super().__init__()
+        if mode not in ("forward", "bidirectional"):
+            raise ValueError(f"Unknown search mode '{mode}', expected 'forward' or 'bidirectional'")
+        self.heuristic = HEURISTICS[heuristic] if isinstance(heuristic, str) else heuristic
+        self.weight = weight
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.mode = mode
+        self.max_states = max_states
+        self.steps_taken = 0
+        self.success = False
+        self.plan = None
+        self.nodes_expanded = 0
+        self.search_time = 0.0
+        self.working_maps = []
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes_expanded / self.search_time if self.search_time > 0 else 0.0
+
+    def successor(self, ogm, positions, module, action):
+        """Positions after a pivot, shifted so module 1 stays at recenter_to like take_action does."""
+        child = positions.copy()
+        child[module - 1] = ogm.pivot_destination(positions[module - 1], action)
+        return child - (child[0] - np.asarray(ogm.recenter_to))
+
+    def cursor(self, ogm, positions, key):
+        """TreeCursor on a sparse map in positions (get_state of ogm, or any configuration in its frame)."""
+        as_dict = lambda array: {m + 1: tuple(p) for m, p in enumerate(array.tolist())}
+        sub = OccupancyGridMap(as_dict(positions), as_dict(ogm.final_positions), len(positions), backend="sparse")
+        self.working_maps.append(sub)
+        return TreeCursor(sub, key, max_walk=len(positions) // WALK_MODULES)
+
+    def expand(self, cursor, table, key):
+        """Yield (module, action, child positions) for every legal move from node key of table."""
+        cursor.goto(table, key)
+        positions = table[key][1]
+        for m, p in zip(*np.nonzero(cursor.ogm.legal_actions())):
+            module, action = int(m) + 1, int(p) + 1
+            yield module, action, self.successor(cursor.ogm, positions, module, action)
+
+    def out_of_budget(self, t0, stored):
+        if self.nodes_expanded >= self.max_nodes:
+            return True
+        if self.max_states is not None and stored >= self.max_states:
+            return True
+        return self.time_limit is not None and time.perf_counter() - t0 > self.time_limit
+
+    def plan_moves(self, ogm):
+        """Search from the current configuration of ogm to its goal.
+
+        The search runs on sparse copies of ogm, which is left untouched.
+
+        Returns:
+            List of (module, action) pairs, or None if a budget ran out first
+        """
+        start = ogm.get_state()
+        ogm.stats.reset()
+        self.stats = ogm.stats
+        self.nodes_expanded = 0
+        self.working_maps = []
+        t0 = time.perf_counter()
+
+        if self.mode == "bidirectional":
+            plan = self.plan_bidirectional(ogm, start, t0)
+        else:
+            plan = self.plan_forward(ogm, start, t0)
+
+        self.search_time = time.perf_counter() - t0
+        # the work happened on the working maps, report it on ogm like the other agents do
+        for sub in self.working_maps:
+            self.stats.merge(sub.stats)
+        self.working_maps = []
+        return plan
+
+    def plan_forward(self, ogm, start, t0):
+        goals = goal_rotations(ogm.final_positions)
+        start_key = canonical_key(start)
+
+        # transposition table: key -> (g, positions, parent key, move)
+        table = {start_key: (0, start, None, None)}
+        cursor = self.cursor(ogm, start, start_key)
+        closed = set()
+        counter = itertools.count()
+        h = self.heuristic(start, goals)
+        frontier = [(self.weight * h, h, next(counter), start_key)]
+
+        while frontier and not self.out_of_budget(t0, len(table)):
+            _, _, _, key = heapq.heappop(frontier)
+            if key in closed:
+                continue
+            g, positions, _, _ = table[key]
+
+            if key == ogm.goal_key:
+                return self.reconstruct(table, key)
+
+            closed.add(key)
+            self.nodes_expanded += 1
+
+            for module, action, child in self.expand(cursor, table, key):
+                child_key = canonical_key(child)
+                if child_key in closed:
+                    continue
+                entry = table.get(child_key)
+                if entry is not None and entry[0] <= g + 1:
+                    continue
+
+                table[child_key] = (g + 1, child, key, (module, action))
+                h = self.heuristic(child, goals)
+                heapq.heappush(frontier, (g + 1 + self.weight * h, h, next(counter), child_key))
+        return None
+
+    def plan_bidirectional(self, ogm, start, t0):
+        goal = ogm.final_positions
+        goal = goal - (goal[0] - np.asarray(ogm.recenter_to))
+        start_key = canonical_key(start)
+        if start_key == ogm.goal_key:
+            return []
+
+        # per side: transposition table key -> (depth, positions, parent key, move) and current layer
+        tables = [{start_key: (0, start, None, None)}, {ogm.goal_key: (0, goal, None, None)}]
+        layers = [[start_key], [ogm.goal_key]]
+        cursors = [self.cursor(ogm, start, start_key), self.cursor(ogm, goal, ogm.goal_key)]
+
+        while layers[0] and layers[1]:
+            side = 0 if len(layers[0]) <= len(layers[1]) else 1
+            table, other = tables[side], tables[1 - side]
+            next_layer = []
+            meet = None
+
+            # finish the whole layer so the shortest meeting point wins
+            for key in layers[side]:
+                if self.out_of_budget(t0, len(table) + len(other)):
+                    return None
+                depth = table[key][0]
+                self.nodes_expanded += 1
+
+                for module, action, child in self.expand(cursors[side], table, key):
+                    child_key = canonical_key(child)
+                    if child_key in table:
+                        continue
+                    table[child_key] = (depth + 1, child, key, (module, action))
+                    next_layer.append(child_key)
+                    if child_key in other:
+                        length = depth + 1 + other[child_key][0]
+                        if meet is None or length < meet[0]:
+                            meet = (length, child_key)
+
+            if meet is not None:
+                return self.stitch(cursors[0].ogm, tables[0], tables[1], meet[1])
+            layers[side] = next_layer
+        return None
+
+    def stitch(self, ogm, forward, backward, key):
+        """Join the start->key moves with the goal side's path from key back to the goal.
+
+        The goal side may have reached key in a rotated frame, so its
+        configurations are rotated onto the forward one and the move between
+        each consecutive pair is recovered from the legal moves. These
+        configurations are not in the forward tree, so ogm jumps to each one
+        with set_state.
+        """
+        moves = self.reconstruct(forward, key)
+        meet = forward[key][1]
+
+        path = []
+        while key is not None:
+            _, positions, parent, _ = backward[key]
+            path.append(positions - positions[0])
+            key = parent
+
+        rotation = next(r for r in ROTATIONS if np.array_equal(path[0] @ r.T, meet - meet[0]))
+        configs = [rel @ rotation.T + np.asarray(ogm.recenter_to) for rel in path]
+
+        for current, target in zip(configs, configs[1:]):
+            ogm.set_state(current)
+            moves_from = ((int(m) + 1, int(p) + 1) for m, p in zip(*np.nonzero(ogm.legal_actions())))
+            move = next(((module, action) for module, action in moves_from
+                         if np.array_equal(self.successor(ogm, current, module, action), target)), None)
+            if move is None:
+                raise RuntimeError("Goal side move could not be reversed onto the forward path")
+            moves.append(move)
+        return moves
+
+    def reconstruct(self, table, key):
+        moves = []
+        while table[key][2] is not None:
+            _, _, parent, move = table[key]
+            moves.append(move)
+            key = parent
+        return moves[::-1]
+
+    def search(self, ogm, visualizer=None):
+        ogm.init_actions()
+        self.plan = self.plan_moves(ogm)
+
+        if self.plan is None:
+            if visualizer:
+                visualizer.capture_state()
+            print(f"Failed to find a plan after expanding {self.nodes_expanded} nodes "
+                  f"({self.nodes_per_second:.0f} nodes/s).")
+            return False
+
+        for module, action in self.plan:
+            if visualizer:
+                visualizer.capture_state()
+            ogm.take_action(module, action)
+            self.steps_taken += 1
+
+        if visualizer:
+            visualizer.capture_state()
+
+        self.success = ogm.check_final()
+        print(f"Goal reached in {self.steps_taken} steps after expanding {self.nodes_expanded} nodes "
+              f"({self.nodes_per_second:.0f} nodes/s).")
+        return self.success
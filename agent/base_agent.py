@@ -1,7 +1,12 @@
 import numpy as np
 
 class Agent:
-    #def __init__(self):
+    def __init__(self, seed=None):
+        # without a seed the global np.random state is used, as before
+        self.seed = seed
+        self.rng = np.random if seed is None else np.random.RandomState(seed)
+        # per-stage counters and timers of the last search, see ogm.instrumentation
+        self.stats = None
 
     def select_action(self, available_actions, num_modules):
         actions_to_take = {}
@@ -9,11 +14,11 @@ class Agent:
         for m in range(1,num_modules+1):
             actions_to_take[m] = np.where(available_actions[m])[0] + 1
 
-        module = np.random.randint(1,m+1)
+        module = self.rng.randint(1,m+1)
         actions = actions_to_take[module]
 
         while len(actions) < 1:
-            module = np.random.randint(1,m+1)
+            module = self.rng.randint(1,m+1)
             actions = actions_to_take[module]
 
-        return (module, actions[np.random.randint(len(actions))])
+        return (module, actions[self.rng.randint(len(actions))])
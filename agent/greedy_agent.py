@@ -0,0 +1,119 @@
+import numpy as np
+
+from agent.base_agent import Agent
+from agent.heuristics import goal_distance, goal_rotations, successor_distances
+from ogm.pivots import PIVOT_DESTINATIONS
+
+
+class GreedyAgent(Agent):
+    """Take the legal move that brings the configuration closest to the goal.
+
+    Every legal (module, pivot) move is scored in one batched call by the
+    labelled L1 distance of its successor to the goal, minimised over the 24
+    goal rotations and over translations (see successor_distances). The goal
+    matches modules by number, so this is the assignment cost with each module
+    assigned to its own goal cell. Ties are broken at random, and among the
+    lookahead best moves the one leading to the least visited configuration
+    wins, which walks the search out of plateaus instead of oscillating.
+    With probability randomness a uniformly random legal move is taken instead.
+    When the best distance has not improved for patience steps, or no legal
+    move is left, the search restarts from the start configuration, up to
+    restarts times.
+    """
+
+    def __init__(self, max_steps=1000, restarts=0, patience=100, randomness=0.0, lookahead=8, seed=None):
+        super().__init__(seed)
+        self.max_steps = max_steps
+        self.restarts = restarts
+        self.patience = patience
+        self.randomness = randomness
+        self.lookahead = lookahead
+        self.steps_taken = 0
+        self.restarts_used = 0
+        self.success = False
+        self.trajectory = []
+
+    def choose(self, ogm, visits):
+        """Pick the next (module, action) and the state key it leads to, None when no move is legal."""
+        mask = ogm.legal_actions()
+        modules, pivots = np.nonzero(mask)
+        if len(modules) == 0:
+            return None
+        if self.randomness > 0 and self.rng.random_sample() < self.randomness:
+            i = self.rng.randint(len(modules))
+            candidates = [i]
+        else:
+            scores = successor_distances(ogm.get_state(), self.goals, modules, PIVOT_DESTINATIONS[pivots])
+            # random tie-break, then best score first
+            order = np.lexsort((self.rng.random_sample(len(scores)), scores))
+            candidates = order[:self.lookahead]
+
+        best = None
+        for i in candidates:
+            move = (int(modules[i]) + 1, int(pivots[i]) + 1)
+            token = ogm.apply(*move)
+            key = ogm.state_key()
+            ogm.revert(token)
+            # candidates come best-first, so only strictly fewer visits displace an earlier one
+            if best is None or visits.get(key, 0) < best[0]:
+                best = (visits.get(key, 0), move, key)
+        return best[1], best[2]
+
+    def search(self, ogm, visualizer=None, stop_event=None):
+        ogm.init_actions()
+        ogm.stats.reset()
+        self.stats = ogm.stats
+        self.goals = goal_rotations(ogm.final_positions)
+        start = ogm.get_state()
+        visits = {ogm.state_key(): 1}
+        best_distance = goal_distance(start, self.goals)
+        since_improvement = 0
+
+        while self.steps_taken < self.max_steps:
+            if stop_event is not None and stop_event.is_set():
+                return False
+
+            if since_improvement >= self.patience and self.restarts_used < self.restarts:
+                self.restarts_used += 1
+                ogm.set_state(start)
+                self.trajectory = []
+                since_improvement = 0
+
+            if visualizer:
+                visualizer.capture_state()
+
+            choice = self.choose(ogm, visits)
+            if choice is None:
+                if self.restarts_used >= self.restarts:
+                    if visualizer:
+                        visualizer.capture_state()
+                    print(f"No legal moves left after {self.steps_taken} steps.")
+                    return False
+                # stuck, restart at the top of the loop
+                since_improvement = self.patience
+                continue
+            (module, action), key = choice
+            ogm.take_action(module, action)
+            self.trajectory.append((module, action))
+            visits[key] = visits.get(key, 0) + 1
+            self.steps_taken += 1
+
+            if ogm.check_final():
+                self.success = True
+                print(f"Goal reached in {self.steps_taken} steps ({len(self.trajectory)} since the last restart)!")
+                if visualizer:
+                    visualizer.capture_state()
+                return True
+
+            distance = goal_distance(ogm.get_state(), self.goals)
+            if distance < best_distance:
+                best_distance = distance
+                since_improvement = 0
+            else:
+                since_improvement += 1
+
+        if visualizer:
+            visualizer.capture_state()
+
+        print(f"Failed to reach goal in {self.max_steps} steps.")
+        return False
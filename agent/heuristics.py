@@ -0,0 +1,120 @@
+import numpy as np
+from ogm.canonical import ROTATIONS
+
+# Admissible, consistent lower bounds on the number of pivots left.
+# Every pivot moves exactly one module by at most one cell per axis and at
+# most 2 in Manhattan distance, and the goal may sit anywhere under any of the
+# 24 cube rotations, so each bound is minimised over rotation and translation.
+
+
+def goal_rotations(final_positions):
+    """All 24 rotations of the goal, relative to module 1, as a (24, n, 3) array."""
+    final_positions = np.asarray(final_positions)
+    rel = final_positions - final_positions[0]
+    return np.einsum('rij,nj->rni', ROTATIONS, rel)
+
+
+def zero(positions, goals):
+    return 0
+
+
+def misplaced_modules(positions, goals):
+    """Fewest modules out of place under the best goal rotation and translation."""
+    diffs = np.asarray(positions, dtype=np.int64)[None] - goals
+    n = diffs.shape[1]
+    # modules in place under a rotation share one translation, the most common diff;
+    # pack each diff into one int64 and lift every rotation into its own range
+    lo = diffs.min()
+    span = diffs.max() - lo + 1
+    d = diffs - lo
+    keys = (d[..., 0] * span + d[..., 1]) * span + d[..., 2] + np.arange(len(diffs))[:, None] * span ** 3
+    keys = np.sort(keys, axis=1).ravel()
+    # longest run of equal keys over all rotations
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    runs = np.diff(np.append(starts, len(keys)))
+    return int(n - runs.max())
+
+
+def half_manhattan(positions, goals):
+    """Manhattan distance to the best-aligned goal, halved since one pivot covers at most 2."""
+    return -(-goal_distance(positions, goals) // 2)
+
+
+def combined(positions, goals):
+    return max(misplaced_modules(positions, goals), half_manhattan(positions, goals))
+
+
+HEURISTICS = {
+    "zero": zero,
+    "misplaced": misplaced_modules,
+    "manhattan": half_manhattan,
+    "combined": combined,
+}
+
+
+def _searchsorted_rows(rows, values):
+    """Row-wise searchsorted(side="right") of values (R, K) into sorted rows (R, n)."""
+    # lift row i into its own disjoint value range so one flat searchsorted serves all rows
+    lo = min(rows.min(), values.min())
+    span = max(rows.max(), values.max()) - lo + 1
+    row = np.arange(len(rows))[:, None]
+    flat = (rows - lo + row * span).ravel()
+    return np.searchsorted(flat, values - lo + row * span, side="right") - row * rows.shape[1]
+
+
+def successor_distances(positions, goals, modules, steps):
+    """Labelled L1 distance to the best-aligned goal after each of K single-module moves.
+
+    The distance is the one half_manhattan halves, minimised over the goal
+    rotations and, per rotation and axis, over translations (the median).
+    A move changes one value per axis, so each successor is scored from the
+    sorted current values and their prefix sums in O(log n) without being
+    materialised.
+
+    Args:
+        positions: (n, 3) current positions
+        goals: (R, n, 3) goal rotations from goal_rotations
+        modules: (K,) 0-based indices of the moved modules
+        steps: (K, 3) displacement of each move
+
+    Returns:
+        (K,) distances
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    modules = np.asarray(modules)
+    steps = np.asarray(steps, dtype=np.int64)
+    n = len(positions)
+    if n == 1 or len(modules) == 0:
+        return np.zeros(len(modules), dtype=np.int64)
+
+    # one row per (rotation, axis): values x = p - R g, sorted, with prefix sums
+    x = (positions[None] - goals).transpose(0, 2, 1).reshape(-1, n)
+    rows = len(x)
+    s = np.sort(x, axis=1)
+    prefix = np.concatenate([np.zeros((rows, 1), dtype=np.int64), np.cumsum(s, axis=1)], axis=1)
+
+    old = x[:, modules]                                   # (rows, K)
+    new = old + np.tile(steps.T, (len(goals), 1))         # (rows, K)
+
+    # median of the multiset with old swapped for new: clamp(new, c[k-1], c[k])
+    # where c is s with one copy of old removed
+    k = n // 2
+    r = np.arange(rows)[:, None]
+    removed_at = _searchsorted_rows(s, old - 1)           # index of the first copy of old
+    lower = s[r, k - 1 + (k - 1 >= removed_at)]
+    upper = s[r, k + (k >= removed_at)] if k <= n - 2 else new
+    t = np.clip(new, lower, np.maximum(upper, lower))
+
+    # sum |s_i - t| from prefix sums, then swap old for new
+    below = _searchsorted_rows(s, t)
+    cost = t * below - prefix[r, below] + (prefix[:, -1:] - prefix[r, below]) - t * (n - below)
+    cost = cost - np.abs(old - t) + np.abs(new - t)
+    return cost.reshape(len(goals), 3, -1).sum(axis=1).min(axis=0)
+
+
+def goal_distance(positions, goals):
+    """Labelled L1 distance to the best-aligned goal, the quantity successor_distances scores."""
+    diffs = np.asarray(positions)[None] - goals
+    # the per-axis median is an optimal integer translation for an L1 sum
+    shift = np.sort(diffs, axis=1)[:, diffs.shape[1] // 2]
+    return int(np.abs(diffs - shift[:, None, :]).sum(axis=(1, 2)).min())
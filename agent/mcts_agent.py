@@ -0,0 +1,199 @@
+import math
+import time
+
+import numpy as np
+
+from agent.base_agent import Agent
+from agent.heuristics import goal_distance, goal_rotations, successor_distances
+from ogm.pivots import PIVOT_DESTINATIONS
+
+
+class Node:
+    """A search tree node, holding the move that leads to it but no state of its own."""
+
+    __slots__ = ("move", "parent", "children", "untried", "visits", "value", "terminal")
+
+    def __init__(self, move=None, parent=None):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.value = 0.0
+        self.terminal = False
+
+
+class MCTSAgent(Agent):
+    """Monte Carlo tree search over pivots with UCT selection.
+
+    Nodes store only the (module, action) that reaches them. Every iteration
+    walks the map down the tree with apply(), rolls out, and walks back with
+    revert(), so the map itself is the only state and no configuration is
+    copied per node. Rollouts pick uniformly random legal moves
+    (rollout="random") or mostly the move closest to the goal
+    (rollout="heuristic", see successor_distances). A rollout that reaches the
+    goal scores 1, otherwise it scores by how much of the initial goal distance
+    is left, scaled into [0, 0.5].
+
+    After each decision the chosen child becomes the new root, so its subtree
+    and statistics carry over to the next decision. Each decision stops after
+    iterations iterations or time_limit seconds, the tree stops growing at
+    max_nodes nodes, and the whole search at max_steps moves.
+    """
+
+    def __init__(self, max_steps=200, iterations=200, time_limit=None, max_nodes=100000,
+                 exploration=1.0, rollout="heuristic", rollout_depth=10, epsilon=0.2, seed=None):
+        super().__init__(seed)
+        if rollout not in ("random", "heuristic"):
+            raise ValueError(f"Unknown rollout policy '{rollout}', expected 'random' or 'heuristic'")
+        self.max_steps = max_steps
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.exploration = exploration
+        self.rollout_policy = rollout
+        self.rollout_depth = rollout_depth
+        self.epsilon = epsilon
+        self.steps_taken = 0
+        self.success = False
+        self.trajectory = []
+        self.root = None
+        self.node_count = 0
+        self.iterations_run = 0
+        self.reused_visits = 0
+
+    def legal_moves(self, ogm):
+        modules, pivots = np.nonzero(ogm.legal_actions())
+        return modules, pivots
+
+    def reached_goal(self, ogm):
+        return ogm.state_key() == ogm.goal_key
+
+    def reward(self, ogm, reached):
+        if reached:
+            return 1.0
+        return 0.5 * max(0.0, 1.0 - goal_distance(ogm.get_state(), self.goals) / self.scale)
+
+    def uct_child(self, node):
+        log_visits = math.log(node.visits)
+        return max(node.children, key=lambda c: c.value / c.visits
+                   + self.exploration * math.sqrt(log_visits / c.visits))
+
+    def rollout_move(self, ogm, modules, pivots):
+        if self.rollout_policy == "random" or self.rng.random_sample() < self.epsilon:
+            i = self.rng.randint(len(modules))
+        else:
+            scores = successor_distances(ogm.get_state(), self.goals, modules, PIVOT_DESTINATIONS[pivots])
+            best = np.flatnonzero(scores == scores.min())
+            i = best[self.rng.randint(len(best))]
+        return int(modules[i]) + 1, int(pivots[i]) + 1
+
+    def rollout(self, ogm):
+        tokens = []
+        reached = False
+        for _ in range(self.rollout_depth):
+            modules, pivots = self.legal_moves(ogm)
+            if len(modules) == 0:
+                break
+            tokens.append(ogm.apply(*self.rollout_move(ogm, modules, pivots)))
+            if self.reached_goal(ogm):
+                reached = True
+                break
+        value = self.reward(ogm, reached)
+        for token in reversed(tokens):
+            ogm.revert(token)
+        return value
+
+    def iterate(self, ogm):
+        """One selection, expansion, rollout and backpropagation pass."""
+        node = self.root
+        tokens = []
+
+        # select down to a node with untried moves, a terminal or a leaf of a full tree
+        while not node.terminal and node.untried is not None and not node.untried and node.children:
+            node = self.uct_child(node)
+            tokens.append(ogm.apply(*node.move))
+
+        if not node.terminal:
+            if node.untried is None:
+                modules, pivots = self.legal_moves(ogm)
+                order = self.rng.permutation(len(modules))
+                node.untried = [(int(modules[i]) + 1, int(pivots[i]) + 1) for i in order]
+            if node.untried and self.node_count < self.max_nodes:
+                child = Node(node.untried.pop(), node)
+                node.children.append(child)
+                self.node_count += 1
+                tokens.append(ogm.apply(*child.move))
+                child.terminal = self.reached_goal(ogm)
+                node = child
+
+        value = 1.0 if node.terminal else self.rollout(ogm)
+        for token in reversed(tokens):
+            ogm.revert(token)
+
+        while node is not None:
+            node.visits += 1
+            node.value += value
+            node = node.parent
+        self.iterations_run += 1
+
+    def count_nodes(self, node):
+        count, stack = 0, [node]
+        while stack:
+            n = stack.pop()
+            count += 1
+            stack.extend(n.children)
+        return count
+
+    def decide(self, ogm):
+        start = time.perf_counter()
+        for i in range(self.iterations):
+            # at least one iteration, so there is always a move to pick
+            if self.time_limit is not None and i > 0 and time.perf_counter() - start > self.time_limit:
+                break
+            self.iterate(ogm)
+        if not self.root.children:
+            return None
+        return max(self.root.children, key=lambda c: (c.terminal, c.visits))
+
+    def search(self, ogm, visualizer=None, stop_event=None):
+        ogm.init_actions()
+        ogm.stats.reset()
+        self.stats = ogm.stats
+        self.goals = goal_rotations(ogm.final_positions)
+        self.scale = max(goal_distance(ogm.get_state(), self.goals), 1)
+        self.root = Node()
+        self.node_count = 1
+
+        while self.steps_taken < self.max_steps:
+            if stop_event is not None and stop_event.is_set():
+                return False
+
+            if visualizer:
+                visualizer.capture_state()
+
+            child = self.decide(ogm)
+            if child is None:
+                break
+            ogm.take_action(*child.move)
+            self.trajectory.append(child.move)
+            self.steps_taken += 1
+
+            # keep the chosen subtree, moves are frame independent so it stays valid after recentering
+            child.parent = None
+            self.root = child
+            self.reused_visits += child.visits
+            self.node_count = self.count_nodes(child)
+
+            if ogm.check_final():
+                self.success = True
+                print(f"Goal reached in {self.steps_taken} steps after {self.iterations_run} iterations!")
+                if visualizer:
+                    visualizer.capture_state()
+                return True
+
+        if visualizer:
+            visualizer.capture_state()
+
+        print(f"Failed to reach goal in {self.steps_taken} steps after {self.iterations_run} iterations.")
+        return False
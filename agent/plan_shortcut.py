@@ -0,0 +1,163 @@
+import time
+
+import numpy as np
+
+from agent.astar_agent import AStarAgent
+from ogm.occupancy_grid_map import OccupancyGridMap
+
+
+class PlanShortcutter:
+    """Shorten a found plan without changing where it ends.
+
+    First every intermediate configuration is hashed and the moves between
+    two visits of the same configuration are cut. The key is the anchored
+    configuration (get_state), not the rotation invariant state_key, since
+    actions are absolute directions and the moves after a loop only replay
+    correctly from the very same frame. If the plan reaches the goal, it is
+    also cut at the first configuration that already matches it. From every
+    configuration that is left, each legal move is tried and the plan jumps
+    to the latest configuration on it that one move reaches.
+
+    Then windows of up to window moves are re-planned with a small exact
+    A* search (AStarAgent, capped at max_nodes expansions) from the first to
+    the last configuration of the window, and the window is replaced when the
+    search finds a shorter path that lands on exactly that configuration.
+    Windows start every stride moves, and cutting loops is repeated after
+    every pass, until a pass gains nothing or time_limit seconds have passed.
+
+    compression_ratio is the original length over the shortened one.
+    """
+
+    def __init__(self, window=8, stride=None, max_nodes=500, heuristic="combined", time_limit=None):
+        if window < 2:
+            raise ValueError("window must cover at least 2 moves")
+        self.window = window
+        self.stride = stride or max(1, window // 2)
+        self.max_nodes = max_nodes
+        self.heuristic = heuristic
+        self.time_limit = time_limit
+        self.original_length = 0
+        self.plan = None
+        self.loops_removed = 0
+        self.moves_skipped = 0
+        self.windows_replanned = 0
+
+    @property
+    def compression_ratio(self):
+        if self.plan is None:
+            return 1.0
+        return self.original_length / max(len(self.plan), 1)
+
+    def replay(self, ogm, plan):
+        """Anchored configurations before and after every move, leaving ogm at the end of plan."""
+        states = [ogm.get_state()]
+        for step, (module, action) in enumerate(plan):
+            if not ogm.legal_actions()[module - 1, action - 1]:
+                raise ValueError(f"Move {step} (module {module}, action {action}) is not legal")
+            ogm.take_action(module, action)
+            states.append(ogm.get_state())
+        return states
+
+    def remove_loops(self, ogm, plan, states):
+        """Cut revisits of the same configuration, and everything after the goal if plan ends there."""
+        end = len(plan)
+        if ogm.check_final():
+            for k, state in enumerate(states):
+                ogm.set_state(state)
+                if ogm.check_final():
+                    end = k
+                    break
+
+        kept, kept_states, seen = [], [states[0]], {states[0].tobytes(): 0}
+        for move, state in zip(plan[:end], states[1:end + 1]):
+            key = state.tobytes()
+            if key in seen:
+                # back to an earlier configuration, drop the loop in between
+                cut = seen[key]
+                for dropped in kept_states[cut + 1:]:
+                    del seen[dropped.tobytes()]
+                self.loops_removed += len(kept) - cut + 1
+                del kept[cut:]
+                del kept_states[cut + 1:]
+            else:
+                kept.append(move)
+                kept_states.append(state)
+                seen[key] = len(kept)
+        self.loops_removed += len(plan) - end
+        return kept, kept_states
+
+    def skip_ahead(self, ogm, plan, states):
+        """Replace every stretch of moves that a single move covers by that move."""
+        last = {state.tobytes(): k for k, state in enumerate(states)}
+        kept, kept_states, i = [], [states[0]], 0
+        while i < len(plan):
+            ogm.set_state(states[i])
+            best, move = i + 1, plan[i]
+            mask = ogm.legal_actions()
+            for m, p in zip(*np.nonzero(mask)):
+                token = ogm.apply(int(m) + 1, int(p) + 1)
+                k = last.get(ogm.get_state().tobytes(), -1)
+                ogm.revert(token)
+                if k > best:
+                    best, move = k, (int(m) + 1, int(p) + 1)
+            self.moves_skipped += best - i - 1
+            kept.append(move)
+            kept_states.append(states[best])
+            i = best
+        return kept, kept_states
+
+    def shortcut(self, ogm, start, target, length):
+        """A plan shorter than length from start to exactly target, or None."""
+        n = len(start)
+        sub = OccupancyGridMap({m + 1: tuple(p) for m, p in enumerate(start.tolist())},
+                               {m + 1: tuple(p) for m, p in enumerate(target.tolist())}, n, backend="sparse")
+        moves = AStarAgent(heuristic=self.heuristic, max_nodes=self.max_nodes).plan_moves(sub)
+        if moves is None or len(moves) >= length:
+            return None
+
+        # the search stops at any rotation of target, only an exact match can be spliced in
+        ogm.set_state(start)
+        for module, action in moves:
+            ogm.take_action(module, action)
+        return moves if np.array_equal(ogm.get_state(), target) else None
+
+    def optimize(self, ogm, plan):
+        """Shortened copy of plan, which must be legal from the current configuration of ogm.
+
+        ogm is left in its starting configuration.
+        """
+        t0 = time.perf_counter()
+        start = ogm.get_state()
+        self.original_length = len(plan)
+        self.loops_removed = 0
+        self.moves_skipped = 0
+        self.windows_replanned = 0
+
+        plan, states = self.remove_loops(ogm, list(plan), self.replay(ogm, plan))
+        plan, states = self.skip_ahead(ogm, plan, states)
+        improved = True
+        while improved and len(plan) > 1:
+            improved = False
+            i = 0
+            while i < len(plan) - 1:
+                if self.time_limit is not None and time.perf_counter() - t0 > self.time_limit:
+                    break
+                j = min(i + self.window, len(plan))
+                moves = self.shortcut(ogm, states[i], states[j], j - i)
+                if moves is not None:
+                    self.windows_replanned += 1
+                    improved = True
+                    plan[i:j] = moves
+                    ogm.set_state(states[i])
+                    states[i:j + 1] = self.replay(ogm, moves)
+                i += self.stride
+
+            ogm.set_state(start)
+            plan, states = self.remove_loops(ogm, plan, self.replay(ogm, plan))
+            plan, states = self.skip_ahead(ogm, plan, states)
+            if self.time_limit is not None and time.perf_counter() - t0 > self.time_limit:
+                break
+
+        ogm.set_state(start)
+        self.plan = plan
+        return plan
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from agent.base_agent import Agent
+from agent.random_search_agent import RandomSearchAgent
+from ogm.instrumentation import Stats
+from ogm.occupancy_grid_map import OccupancyGridMap
+
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _run_seeded_search(task):
+    """Run one seeded RandomSearchAgent in a worker process and report how it went."""
+    seed, module_positions, final_module_positions, n, backend, max_steps = task
+    result = {"seed": seed, "success": False, "steps": 0, "elapsed": 0.0,
+              "steps_per_second": 0.0, "trajectory": None, "pid": os.getpid(), "stats": None}
+    if _stop_event.is_set():
+        return result
+
+    t0 = time.perf_counter()
+    ogm = OccupancyGridMap(module_positions, final_module_positions, n, backend=backend)
+    agent = RandomSearchAgent(max_steps=max_steps, seed=seed)
+    success = agent.search(ogm, stop_event=_stop_event)
+
+    result["elapsed"] = time.perf_counter() - t0
+    result["success"] = success
+    result["steps"] = agent.steps_taken
+    result["steps_per_second"] = agent.steps_taken / result["elapsed"] if result["elapsed"] > 0 else 0.0
+    result["stats"] = agent.stats.as_dict()
+    if success:
+        result["trajectory"] = agent.trajectory
+    return result
+
+
+class PortfolioSearchAgent(Agent):
+    """Independently seeded random searches raced across a process pool.
+
+    The first trajectory to reach the goal wins, the remaining searches see a
+    shared stop event on their next step and return, searches that have not
+    started yet are skipped. The winning seed is kept so the run can be
+    reproduced with RandomSearchAgent(seed=...).
+    """
+
+    def __init__(self, num_searches=None, processes=None, max_steps=1000, seed=None):
+        super().__init__(seed)
+        self.processes = processes or os.cpu_count()
+        self.num_searches = num_searches or self.processes
+        self.max_steps = max_steps
+        self.steps_taken = 0
+        self.success = False
+        self.trajectory = None
+        self.winning_seed = None
+        self.worker_stats = []
+
+    def search(self, ogm, visualizer=None):
+        ogm.init_actions()
+        seeds = np.random.SeedSequence(self.seed).generate_state(self.num_searches)
+        tasks = [(int(s), dict(ogm.module_positions), dict(ogm.final_module_positions),
+                  len(ogm.modules), ogm.backend, self.max_steps) for s in seeds]
+
+        stop_event = multiprocessing.Event()
+        self.worker_stats = []
+        # stage counters and timers summed over all workers
+        self.stats = Stats()
+        with multiprocessing.Pool(self.processes, initializer=_init_worker, initargs=(stop_event,)) as pool:
+            for result in pool.imap_unordered(_run_seeded_search, tasks):
+                self.worker_stats.append(result)
+                if result["stats"] is not None:
+                    self.stats.merge(result["stats"])
+                if result["success"] and self.trajectory is None:
+                    self.trajectory = result["trajectory"]
+                    self.winning_seed = result["seed"]
+                    stop_event.set()
+
+        if self.trajectory is None:
+            if visualizer:
+                visualizer.capture_state()
+            print(f"Failed to reach goal with {self.num_searches} searches of {self.max_steps} steps.")
+            return False
+
+        # replay the winner on the caller's map
+        for module, action in self.trajectory:
+            if visualizer:
+                visualizer.capture_state()
+            ogm.take_action(module, action)
+            self.steps_taken += 1
+
+        if visualizer:
+            visualizer.capture_state()
+
+        self.success = ogm.check_final()
+        print(f"Goal reached in {self.steps_taken} steps by seed {self.winning_seed}!")
+        return self.success
@@ -1,16 +1,22 @@
 from agent.base_agent import Agent
 
 class RandomSearchAgent(Agent):
-    def __init__(self, max_steps=1000):
-        super().__init__()
+    def __init__(self, max_steps=1000, seed=None):
+        super().__init__(seed)
         self.max_steps = max_steps
         self.steps_taken = 0
         self.success = False
+        self.trajectory = []
 
-    def search(self, ogm, visualizer=None):
+    def search(self, ogm, visualizer=None, stop_event=None):
         ogm.init_actions()
+        ogm.stats.reset()
+        self.stats = ogm.stats
 
         while self.steps_taken < self.max_steps:
+            # lets a portfolio of searches abandon this one once another succeeds
+            if stop_event is not None and stop_event.is_set():
+                return False
 
             if visualizer:
                 visualizer.capture_state()
@@ -18,6 +24,7 @@ class RandomSearchAgent(Agent):
             possible_actions = ogm.calc_possible_actions()
             module, action = self.select_action(possible_actions, len(ogm.modules))
             ogm.take_action(module, action)
+            self.trajectory.append((module, action))
             self.steps_taken += 1
 
             if ogm.check_final():
@@ -0,0 +1,42 @@
+import itertools
+
+import numpy as np
+
+
+def cube_rotations():
+  """The 24 proper rotations of the cube as signed permutation matrices.
+
+  Returns:
+      (24, 3, 3) integer array, the identity comes first
+  """
+  rotations = []
+  for perm in itertools.permutations(range(3)):
+    for signs in itertools.product((1, -1), repeat=3):
+      r = np.zeros((3, 3), dtype=int)
+      r[range(3), perm] = signs
+      if round(np.linalg.det(r)) == 1:
+        rotations.append(r)
+  return np.array(rotations)
+
+
+ROTATIONS = cube_rotations()
+
+
+def canonical_key(positions):
+  """Key of a labelled configuration, invariant under translation and rotation.
+
+  Positions are taken relative to module 1 (the first row), rotated by all
+  24 cube rotations and the smallest byte string wins, so two configurations
+  get the same key iff one is a rigid motion of the other with every module
+  in the corresponding place.
+
+  Args:
+      positions: (n, 3) integer array of module positions ordered by module number
+
+  Returns:
+      bytes usable as a dict/set key
+  """
+  rel = np.asarray(positions, dtype=np.int32)
+  rel = rel - rel[0]
+  rotated = np.einsum('rij,nj->rni', ROTATIONS.astype(np.int32), rel)
+  return min(r.tobytes() for r in rotated)
@@ -0,0 +1,585 @@
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+from ogm.instrumentation import Stats
+from ogm.occupancy import pack_coords
+from ogm.positions import position_items
+
+# the six face neighbors of a cell
+FACE_STEPS = np.array([[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1]])
+
+# the 3x3x3 cube around a cell, index 13 is the cell itself
+CUBE_OFFSETS = np.stack(np.meshgrid(*[np.arange(-1, 2)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+CUBE_CENTER = 13
+CUBE_FACES = [i for i, o in enumerate(CUBE_OFFSETS) if np.abs(o).sum() == 1]
+CUBE_ADJ = [[j for j, q in enumerate(CUBE_OFFSETS) if np.abs(o - q).sum() == 1] for o in CUBE_OFFSETS]
+
+# every module whose cube can contain a given cell or whose neighbors' degrees can change
+REGION_OFFSETS = np.stack(np.meshgrid(*[np.arange(-2, 3)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+
+NOT_AP, UNDECIDED, IS_AP = -1, 0, 1
+
+# modules a module's first articulation point search may visit, see ConnectivityTracker
+SEARCH_BUDGET = 16
+# modules the searches of one read may visit, per module of the configuration
+READ_BUDGET = 8
+# witness modules kept, per module of the configuration
+WITNESS_MEMORY = 32
+
+
+@lru_cache(maxsize=65536)
+def neighbors_locally_connected(mask):
+  """Check whether the occupied face cells of a cube reach each other without its center.
+
+  Args:
+      mask: 27-bit occupancy of the 3x3x3 cube, the center bit is ignored
+
+  Returns:
+      True if all occupied face neighbors are connected through occupied cube cells
+  """
+  faces = [i for i in CUBE_FACES if mask >> i & 1]
+  if len(faces) <= 1:
+    return True
+
+  seen = {faces[0]}
+  stack = [faces[0]]
+  while stack:
+    u = stack.pop()
+    for v in CUBE_ADJ[u]:
+      if v != CUBE_CENTER and v not in seen and mask >> v & 1:
+        seen.add(v)
+        stack.append(v)
+  return all(f in seen for f in faces)
+
+
+class CSRGraph:
+  """Module adjacency as CSR arrays, vertex i standing for module i+1.
+
+  The neighbors of vertex i are indices[indptr[i]:indptr[i+1]]. Articulation
+  points and components are found without recursion, so chains of any length
+  work, and are cached so connected_without() is O(1) after the first query.
+  """
+
+  def __init__(self, indptr, indices):
+    self.indptr = np.asarray(indptr, dtype=np.int64)
+    self.indices = np.asarray(indices, dtype=np.int64)
+    self.n = len(self.indptr) - 1
+    self._ap_mask = None
+    self._labels = None
+
+  @classmethod
+  def from_positions(cls, positions):
+    """Face adjacency of an (n,3) integer array whose row i holds module i+1."""
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+    n = len(positions)
+    if n == 0:
+      return cls([0], [])
+    keys = pack_coords(positions)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    found = pack_coords(positions[:, None, :] + FACE_STEPS)
+    idx = np.minimum(np.searchsorted(sorted_keys, found), n - 1)
+    hit = sorted_keys[idx] == found
+    indptr = np.concatenate([[0], np.cumsum(hit.sum(axis=1))])
+    return cls(indptr, order[idx[hit]])
+
+  @classmethod
+  def from_edges(cls, n, edges):
+    """Graph on vertices 0..n-1 from a list of [u, v] pairs."""
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    src = np.concatenate([edges[:, 0], edges[:, 1]])
+    dst = np.concatenate([edges[:, 1], edges[:, 0]])
+    order = np.argsort(src, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))])
+    return cls(indptr, dst[order])
+
+  @classmethod
+  def from_adjacency(cls, adj):
+    """Graph from a module -> neighbor set mapping over modules 1..n."""
+    n = max(adj, default=0)
+    degrees = np.zeros(n, dtype=np.int64)
+    for m, neighbors in adj.items():
+      degrees[m - 1] = len(neighbors)
+    indices = np.fromiter((u - 1 for m in range(1, n + 1) for u in adj.get(m, ())),
+                          dtype=np.int64, count=int(degrees.sum()))
+    return cls(np.concatenate([[0], np.cumsum(degrees)]), indices)
+
+  def articulation_mask(self):
+    """Boolean (n,) mask of cut vertices, iterative Tarjan."""
+    if self._ap_mask is not None:
+      return self._ap_mask
+    n = self.n
+    indptr = self.indptr.tolist()
+    indices = self.indices.tolist()
+    nxt = indptr[:-1]
+    disc = [0] * n
+    low = [0] * n
+    parent = [-1] * n
+    is_ap = [False] * n
+    time = 0
+
+    for root in range(n):
+      if disc[root]:
+        continue
+      time += 1
+      disc[root] = low[root] = time
+      root_children = 0
+      stack = [root]
+      while stack:
+        u = stack[-1]
+        e, end, pu = nxt[u], indptr[u + 1], parent[u]
+        v = -1
+        # scan back edges until the next unvisited neighbor
+        while e < end:
+          w = indices[e]
+          e += 1
+          if not disc[w]:
+            v = w
+            break
+          if w != pu and disc[w] < low[u]:
+            low[u] = disc[w]
+        nxt[u] = e
+        if v >= 0:
+          parent[v] = u
+          time += 1
+          disc[v] = low[v] = time
+          stack.append(v)
+          continue
+
+        stack.pop()
+        if pu >= 0:
+          if low[u] < low[pu]:
+            low[pu] = low[u]
+          if pu == root:
+            root_children += 1
+          elif low[u] >= disc[pu]:
+            is_ap[pu] = True
+      if root_children > 1:
+        is_ap[root] = True
+
+    self._ap_mask = np.array(is_ap, dtype=bool)
+    return self._ap_mask
+
+  def articulation_points(self):
+    """Articulation points as a set of module numbers."""
+    return set((np.nonzero(self.articulation_mask())[0] + 1).tolist())
+
+  def component_labels(self):
+    """Component index of every vertex, iterative BFS."""
+    if self._labels is not None:
+      return self._labels
+    indptr = self.indptr.tolist()
+    indices = self.indices.tolist()
+    labels = [-1] * self.n
+    count = 0
+    for root in range(self.n):
+      if labels[root] >= 0:
+        continue
+      labels[root] = count
+      frontier = [root]
+      while frontier:
+        u = frontier.pop()
+        for w in indices[indptr[u]:indptr[u + 1]]:
+          if labels[w] < 0:
+            labels[w] = count
+            frontier.append(w)
+      count += 1
+    self._labels = np.array(labels, dtype=np.int64)
+    self.num_components = count
+    return self._labels
+
+  def is_connected(self):
+    self.component_labels()
+    return self.num_components <= 1
+
+  def connected_without(self, module):
+    """Whether the other modules are still one component once module is removed."""
+    v = module - 1
+    labels = self.component_labels()
+    if self.num_components == 1:
+      return not self.articulation_mask()[v]
+    # only an isolated module can leave a single component behind
+    return self.num_components == 2 and self.indptr[v + 1] == self.indptr[v]
+
+
+class ConnectivityTracker:
+  """Module adjacency and articulation points kept up to date across moves.
+
+  A move only touches the edges of the moving module, so the adjacency is
+  patched with six neighbor lookups. Articulation status is first decided
+  locally for every module near the move: a module of degree <= 1 or whose
+  neighbors are connected inside its 3x3x3 cube is never an articulation
+  point, and a module with a leaf neighbor always is.
+
+  The remaining, undecided modules are resolved on read by one breadth-first
+  search from each of their neighbors (see _search), which leaves a witness
+  behind: paths connecting all neighbors (not an articulation point) or a
+  component that misses one of them (an articulation point). A move can only
+  break a witness it passes through, so after a move only the undecided
+  modules whose edges changed and those whose witness holds the moved module
+  or, for a component, is joined to the rest by it are searched again.
+
+  A module's first search may visit budget modules and every search that
+  gives up quadruples the cap of the next one, while the searches of one
+  read visit at most READ_BUDGET * n + 64 * budget modules in all. Modules
+  left over once that is spent, and modules whose witness, or search cap,
+  would take the kept witnesses past WITNESS_MEMORY * n modules (long bars,
+  where both sides of every module are long), are answered by one Tarjan
+  pass over the whole graph (CSRGraph), cached until the graph changes.
+
+  aps is the set of articulation points once resolve() has run, and every
+  module whose membership may have changed is added to changed.
+  """
+
+  def __init__(self, occupancy, module_positions, stats=None, budget=SEARCH_BUDGET):
+    self.occupancy = occupancy
+    self.stats = Stats() if stats is None else stats
+    self.budget = budget
+    self.rebuild(module_positions)
+
+  def rebuild(self, module_positions):
+    modules, positions = position_items(module_positions)
+    modules = modules.tolist()
+    neighbors = self.occupancy.lookup(positions[:, None, :] + FACE_STEPS)
+
+    self.adj = {m: set(int(u) for u in row if u > 0) for m, row in zip(modules, neighbors)}
+    self.status = {}
+    self.certain_aps = set()
+    self.undecided = set()
+    self.aps = set()
+    self.changed = set(modules)
+    # undecided module -> (is articulation point, witness modules or None when answered by Tarjan)
+    self.witness = {}
+    # module -> undecided modules whose witness holds it
+    self.watchers = {}
+    self.unresolved = set()
+    # answered by Tarjan for this read only, and for as long as their edges stay the same
+    self._global = set()
+    self._hopeless = set()
+    self._hopeless_stale = False
+    self._stored = 0
+    # search cap that last settled a module, or that its last search gave up at
+    self._caps = {}
+    self._global_aps = None
+    self._graph_dirty = True
+    self._certify(modules, positions)
+
+  def move(self, module, old_pos, new_pos):
+    """Patch adjacency, certificates and witnesses after module went from old_pos to new_pos.
+
+    The occupancy store must already reflect the move.
+
+    Returns:
+        Undo record for undo(), holding only the state this move touched
+    """
+    undo = (self._global_aps, self._graph_dirty)
+    old_neighbors = self.adj[module]
+    for u in old_neighbors:
+      self.adj[u].discard(module)
+
+    found = self.occupancy.lookup(np.asarray(new_pos) + FACE_STEPS)
+    new_neighbors = set(int(u) for u in found if u > 0)
+    for u in new_neighbors:
+      self.adj[u].add(module)
+    self.adj[module] = new_neighbors
+    self._check_witnesses(module, old_neighbors, new_neighbors)
+
+    region = np.concatenate([np.asarray(old_pos) + REGION_OFFSETS, np.asarray(new_pos) + REGION_OFFSETS])
+    ids = self.occupancy.lookup(region)
+    keep = ids > 0
+    affected, first = np.unique(ids[keep], return_index=True)
+    affected = [int(m) for m in affected]
+    previous = {m: self.status[m] for m in affected}
+    self._certify(affected, region[keep][first])
+    self._forget_edges(module, old_neighbors, new_neighbors)
+    return (module, old_neighbors, new_neighbors, previous) + undo
+
+  def undo(self, record):
+    """Restore adjacency and certificates from a move() record, witnesses are checked as for a move back."""
+    module, old_neighbors, new_neighbors, previous, global_aps, graph_dirty = record
+    for u in new_neighbors:
+      self.adj[u].discard(module)
+    for u in old_neighbors:
+      self.adj[u].add(module)
+    self.adj[module] = old_neighbors
+    self._check_witnesses(module, new_neighbors, old_neighbors)
+
+    for m, status in previous.items():
+      self._set_status(m, status)
+    self._forget_edges(module, old_neighbors, new_neighbors)
+    self._global_aps = global_aps
+    self._graph_dirty = graph_dirty
+
+  def _check_witnesses(self, module, old_neighbors, new_neighbors):
+    """Drop the witnesses that module's move from old_neighbors to new_neighbors may have broken."""
+    if new_neighbors == old_neighbors:
+      return
+    self._graph_dirty = True
+    self._hopeless_stale = True
+    for u in list(self._global):
+      self._forget(u)
+
+    for u in list(self.watchers.get(module, ())) + [u for v in new_neighbors for u in self.watchers.get(v, ())]:
+      entry = self.witness.get(u)
+      if entry is None:
+        continue
+      is_ap, modules = entry
+      if not is_ap:
+        # the moved module was on a connecting path, insertions never disconnect
+        if module in modules:
+          self._forget(u)
+        continue
+      # a component of the graph without u stays one unless the move joins it to the rest
+      touching = new_neighbors - {u}
+      inside = [v in modules for v in touching]
+      if any(inside) and not all(inside):
+        self._forget(u)
+      elif any(inside):
+        self._watch(u, module)
+      elif module in modules:
+        modules.discard(module)
+        self._stored -= 1
+        self.watchers[module].discard(u)
+        if not modules:
+          self._forget(u)
+
+  def _forget_edges(self, module, old_neighbors, new_neighbors):
+    """Search again for the undecided modules whose own edges changed."""
+    for u in old_neighbors ^ new_neighbors | {module}:
+      self._caps.pop(u, None)
+      self._hopeless.discard(u)
+      if u in self.undecided:
+        self._forget(u)
+
+  def _certify(self, modules, positions):
+    if len(modules) == 0:
+      return
+    cubes = self.occupancy.lookup(np.asarray(positions)[:, None, :] + CUBE_OFFSETS) > 0
+    masks = cubes.astype(np.int64) @ (np.int64(1) << np.arange(27, dtype=np.int64))
+
+    for m, mask in zip(modules, masks):
+      neighbors = self.adj[m]
+      if len(neighbors) <= 1:
+        status = NOT_AP
+      elif any(len(self.adj[u]) == 1 for u in neighbors):
+        status = IS_AP
+      elif neighbors_locally_connected(int(mask)):
+        status = NOT_AP
+      else:
+        status = UNDECIDED
+      self._set_status(m, status)
+
+  def _set_status(self, m, status):
+    self.status[m] = status
+    if status == IS_AP:
+      self.certain_aps.add(m)
+    else:
+      self.certain_aps.discard(m)
+    if status == UNDECIDED:
+      # a witness stays valid while the module's own edges do, _forget_edges drops it otherwise
+      if m not in self.undecided:
+        self.undecided.add(m)
+        self._forget(m)
+    else:
+      self.undecided.discard(m)
+      self.unresolved.discard(m)
+      self._hopeless.discard(m)
+      self._caps.pop(m, None)
+      self._drop_witness(m)
+      self._set_ap(m, status == IS_AP)
+
+  def _set_ap(self, m, is_ap):
+    if is_ap != (m in self.aps):
+      if is_ap:
+        self.aps.add(m)
+      else:
+        self.aps.discard(m)
+      self.changed.add(m)
+
+  def _watch(self, u, v):
+    modules = self.witness[u][1]
+    if v not in modules:
+      modules.add(v)
+      self._stored += 1
+    self.watchers.setdefault(v, set()).add(u)
+
+  def _drop_witness(self, u):
+    entry = self.witness.pop(u, None)
+    self._global.discard(u)
+    if entry is not None and entry[1] is not None:
+      self._stored -= len(entry[1])
+      for v in entry[1]:
+        watching = self.watchers[v]
+        watching.discard(u)
+        if not watching:
+          del self.watchers[v]
+
+  def _forget(self, u):
+    self._drop_witness(u)
+    if u not in self._hopeless:
+      self.unresolved.add(u)
+
+  def _search(self, u, budget):
+    """Decide whether u is an articulation point from its neighborhood outward.
+
+    A breadth-first search starts at every neighbor of u, u itself left out,
+    and searches that reach each other merge. They take turns one module at a
+    time, so the cost is bounded by the smaller side when u is a cut vertex
+    and by the detour around u when it is not. Only the search paths that
+    joined two searches are kept as the witness of a module that is not a
+    cut vertex, so moves elsewhere in the searched area do not break it.
+
+    Returns:
+        (False, modules that connect all neighbors) when the searches merged
+        into one, (True, component missing a neighbor) when a search ran out
+        of modules first, or (None, None) after budget modules were visited,
+        followed by the number of modules visited
+    """
+    adj = self.adj
+    parent = {a: a for a in adj[u]}
+    label = dict(parent)
+    groups = {a: (deque([a]), {a}) for a in adj[u]}
+    pred = dict.fromkeys(adj[u])
+    links = set()
+    visited = len(parent)
+
+    def find(x):
+      while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+      return x
+
+    while True:
+      for root in list(groups):
+        if root not in groups:
+          continue
+        queue, members = groups[root]
+        if not queue:
+          return True, members, visited
+        v = queue.popleft()
+        for w in adj[v]:
+          if w == u:
+            continue
+          if w not in label:
+            label[w] = root
+            pred[w] = v
+            members.add(w)
+            queue.append(w)
+            visited += 1
+            continue
+          other = find(label[w])
+          if other == root:
+            continue
+          for x in (v, w):
+            while x is not None and x not in links:
+              links.add(x)
+              x = pred[x]
+          # merge the smaller search into the larger one
+          if len(groups[other][1]) > len(members):
+            root, other = other, root
+          queue, members = groups[root]
+          merged_queue, merged = groups.pop(other)
+          queue.extend(merged_queue)
+          members |= merged
+          parent[other] = root
+          if len(groups) == 1:
+            return False, links, visited
+        if visited > budget:
+          return None, None, visited
+
+  def resolve(self):
+    """Settle every undecided module whose witness is missing."""
+    if self.unresolved:
+      self._resolve_searches()
+    if self._hopeless and self._hopeless_stale:
+      # set operations only, so bars of any length cost no more than the Tarjan pass
+      aps = self._current_global_aps()
+      hopeless_aps = self._hopeless & aps
+      self.changed |= (self.aps & self._hopeless) ^ hopeless_aps
+      self.aps -= self._hopeless
+      self.aps |= hopeless_aps
+      self._hopeless_stale = False
+
+  def _resolve_searches(self):
+    pending = sorted(self.unresolved, key=lambda u: self._caps.get(u, self.budget))
+    self.unresolved.clear()
+    total = READ_BUDGET * len(self.adj) + 64 * self.budget
+    memory = WITNESS_MEMORY * len(self.adj)
+    over_budget = []
+    for u in pending:
+      cap = self._caps.get(u, self.budget)
+      room = memory - self._stored
+      is_ap = None
+      while is_ap is None and cap <= min(total, room):
+        is_ap, modules, visited = self._search(u, cap)
+        self.stats.count("articulation_points.searches")
+        total -= visited
+        if is_ap is None:
+          cap *= 4
+      if is_ap is None and cap > room or is_ap is not None and len(modules) > room:
+        # too long to keep, answered by Tarjan until the module's edges change
+        self._hopeless.add(u)
+        self._hopeless_stale = True
+        continue
+      if is_ap is None:
+        self._caps[u] = cap
+        over_budget.append(u)
+        continue
+      self._caps[u] = cap
+      self.witness[u] = (is_ap, modules)
+      self._stored += len(modules)
+      for v in modules:
+        self.watchers.setdefault(v, set()).add(u)
+      self._set_ap(u, is_ap)
+
+    if over_budget:
+      aps = self._current_global_aps()
+      for u in over_budget:
+        self.witness[u] = (u in aps, None)
+        self._global.add(u)
+        self._set_ap(u, u in aps)
+
+  def articulation_points(self):
+    if self.unresolved or self._hopeless_stale:
+      self.resolve()
+    else:
+      self.stats.count("articulation_points.local")
+    return set(self.aps)
+
+  def pop_changed(self):
+    """Resolve and return the modules whose articulation status may have changed since the last call."""
+    self.resolve()
+    changed, self.changed = self.changed, set()
+    return changed
+
+  def _current_global_aps(self):
+    if self._graph_dirty or self._global_aps is None:
+      self.stats.count("articulation_points.full")
+      self._global_aps = self.full_articulation_points()
+      self._graph_dirty = False
+    else:
+      self.stats.count("articulation_points.cached")
+    return self._global_aps
+
+  def connected_without(self, module):
+    """Whether the configuration stays connected when module is lifted out.
+
+    Answered from the local certificate when there is one, otherwise from the
+    module's witness, searched for first if it has none.
+    """
+    status = self.status[module]
+    if status != UNDECIDED:
+      return status == NOT_AP
+    if module in self.unresolved or module in self._hopeless and self._hopeless_stale:
+      self.resolve()
+    return module not in self.aps
+
+  def full_articulation_points(self):
+    """Articulation points of the whole adjacency, see CSRGraph."""
+    return CSRGraph.from_adjacency(self.adj).articulation_points()
+
+  @property
+  def edges(self):
+    return sorted([u - 1, v - 1] for u in self.adj for v in self.adj[u] if u < v)
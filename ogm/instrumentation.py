@@ -0,0 +1,55 @@
+from time import perf_counter
+
+
+class Stats:
+  """Per-stage call counters and cumulative wall time.
+
+  Timed stages are recorded as
+
+      t0 = perf_counter()
+      ...
+      stats.record("pivot_checks", t0)
+
+  which costs two clock reads and two dict updates, so it is left on in the
+  hot path. Stages that are only counted use count().
+  """
+
+  def __init__(self):
+    self.reset()
+
+  def reset(self):
+    self.counts = {}
+    self.times = {}
+
+  def record(self, stage, t0):
+    self.times[stage] = self.times.get(stage, 0.0) + perf_counter() - t0
+    self.counts[stage] = self.counts.get(stage, 0) + 1
+
+  def count(self, stage, n=1):
+    self.counts[stage] = self.counts.get(stage, 0) + n
+
+  def merge(self, other):
+    """Add the counters and timers of another Stats (or its as_dict()) into this one."""
+    if isinstance(other, Stats):
+      other = other.as_dict()
+    for stage, n in other["counts"].items():
+      self.count(stage, n)
+    for stage, t in other["times"].items():
+      self.times[stage] = self.times.get(stage, 0.0) + t
+    return self
+
+  def as_dict(self):
+    return {"counts": dict(self.counts), "times": dict(self.times)}
+
+  def summary(self):
+    lines = []
+    for stage in sorted(self.counts):
+      if stage in self.times:
+        t = self.times[stage]
+        lines.append(f"{stage:<24} {self.counts[stage]:>10} calls {t:>10.4f} s {1e6 * t / self.counts[stage]:>10.1f} us/call")
+      else:
+        lines.append(f"{stage:<24} {self.counts[stage]:>10}")
+    return "\n".join(lines)
+
+  def __repr__(self):
+    return f"Stats(counts={self.counts}, times={self.times})"
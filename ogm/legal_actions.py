@@ -0,0 +1,95 @@
+from time import perf_counter
+
+import numpy as np
+from ogm.pivot_cache import NEIGHBORHOOD_OFFSETS
+
+
+class LegalActionSet:
+  """The legal pivots of a map, maintained across moves instead of rebuilt.
+
+  A pivot only changes the occupancy of two cells, and a module's pivots only
+  read its 48-cell neighborhood, so after a move only the modules with one of
+  those cells in their neighborhood (the neighborhood is symmetric, so the
+  modules found at the same offsets around the two cells) are re-evaluated.
+  Articulation points are applied on read: the connectivity tracker reports
+  the modules whose status may have changed since the last read (see
+  ConnectivityTracker.pop_changed), and only their rows are recomputed from
+  the kept geometric rows.
+
+  mask is a read-only view of one buffer that is updated in place, so reading
+  it costs nothing beyond the articulation point refresh; read it again after
+  moving rather than copying it. articulation_points is likewise the
+  tracker's live set. Recentering and set_state rebuild everything.
+  """
+
+  def __init__(self, ogm):
+    self.ogm = ogm
+    self._mask = np.zeros((len(ogm.modules), 48), dtype=bool)
+    self._view = self._mask.view()
+    self._view.flags.writeable = False
+    self.rebuild()
+
+  def rebuild(self):
+    ogm = self.ogm
+    t0 = perf_counter()
+    self._pivots = ogm.pivot_rows(ogm.positions)
+    ogm.stats.record("pivot_checks", t0)
+    self._mask[:] = self._pivots
+    # every articulation point is masked again on the next read, not only the changed ones
+    self._remask = True
+    self._stale = True
+    ogm.stats.record("legal_set.rebuild", t0)
+
+  def moved(self, old_pos, new_pos):
+    """Re-evaluate the modules around a module that went from old_pos to new_pos.
+
+    The occupancy store and module positions must already reflect the move.
+    """
+    ogm = self.ogm
+    t0 = perf_counter()
+    region = np.concatenate([np.asarray(old_pos) - NEIGHBORHOOD_OFFSETS, np.asarray(new_pos) - NEIGHBORHOOD_OFFSETS])
+    ids = ogm.occupancy.lookup(region)
+    # the moved module itself sits next to its old cell, so it is always among them
+    modules = np.unique(ids[ids > 0])
+    rows = modules - 1
+    t1 = perf_counter()
+    pivots = ogm.pivot_rows(ogm.positions[rows])
+    ogm.stats.record("pivot_checks", t1)
+    self._pivots[rows] = pivots
+    self._mask[rows] = pivots
+    # statuses that change before the next read are reported by pop_changed
+    aps = ogm.connectivity.aps
+    for m in modules.tolist():
+      if m in aps:
+        self._mask[m - 1] = False
+    self._stale = True
+    ogm.stats.count("legal_set.modules", len(modules))
+    ogm.stats.record("legal_set.update", t0)
+
+  def _refresh(self):
+    t0 = perf_counter()
+    connectivity = self.ogm.connectivity
+    changed = connectivity.pop_changed()
+    aps = connectivity.aps
+    if self._remask:
+      changed |= aps
+      self._remask = False
+    for m in changed:
+      self._mask[m - 1] = False if m in aps else self._pivots[m - 1]
+    self._stale = False
+    self.ogm.stats.count("legal_set.refreshed", len(changed))
+    self.ogm.stats.record("articulation_points", t0)
+
+  @property
+  def mask(self):
+    """Live read-only (n, 48) legal pivot mask, row m-1 for module m."""
+    if self._stale:
+      self._refresh()
+    return self._view
+
+  @property
+  def articulation_points(self):
+    """Live set of the current articulation points, copy it to keep a snapshot."""
+    if self._stale:
+      self._refresh()
+    return self.ogm.connectivity.aps
@@ -0,0 +1,242 @@
+import numpy as np
+from ogm.positions import position_items
+
+# coordinates are packed into 21 bits per axis for the sparse store
+PACK_BITS = 21
+PACK_BIAS = 1 << (PACK_BITS - 1)
+
+
+def pack_coords(coords):
+  """Pack integer (..., 3) coordinates into single int64 keys.
+
+  Args:
+      coords: Integer array whose last axis holds (x,y,z)
+
+  Returns:
+      int64 array with the shape of coords minus its last axis
+  """
+  c = np.asarray(coords, dtype=np.int64) + PACK_BIAS
+  return (c[..., 0] << (2 * PACK_BITS)) | (c[..., 1] << PACK_BITS) | c[..., 2]
+
+
+def grid_dtype(shape):
+  """Smallest integer dtype for module numbers of a grid, which has more cells per side than modules."""
+  return np.int16 if max(shape) <= np.iinfo(np.int16).max else np.int32
+
+
+class DenseOccupancy:
+  """Occupancy stored as a dense cube of module numbers (0 means empty)."""
+
+  def __init__(self, shape):
+    self.shape = tuple(shape)
+    self.grid = np.zeros(self.shape, dtype=grid_dtype(self.shape))
+
+  def fill(self, module_positions):
+    modules, positions = position_items(module_positions)
+    self.grid[:] = 0
+    self.grid[positions[:, 0], positions[:, 1], positions[:, 2]] = modules
+
+  def move(self, old_pos, new_pos, module):
+    self.grid[old_pos[0], old_pos[1], old_pos[2]] = 0
+    self.grid[new_pos[0], new_pos[1], new_pos[2]] = module
+
+  def lookup(self, coords):
+    """Module numbers at coords, 0 for empty cells and -1 outside the grid."""
+    coords = np.asarray(coords)
+    shape = np.array(self.shape)
+    in_bounds = np.all((coords >= 0) & (coords < shape), axis=-1)
+    coords = np.clip(coords, 0, shape - 1)
+    ids = self.grid[coords[..., 0], coords[..., 1], coords[..., 2]].astype(int)
+    return np.where(in_bounds, ids, -1)
+
+  def occupied(self, coords):
+    """1 for occupied cells, 0 for empty ones and -1 outside the grid."""
+    return np.sign(self.lookup(coords)).astype(np.int8)
+
+  def fits(self, pos, margin=0):
+    """Whether pos is at least margin cells inside the grid."""
+    return all(margin <= c < size - margin for c, size in zip(pos, self.shape))
+
+  def equals(self, other):
+    return np.array_equal(self.grid, other.grid)
+
+  def to_array(self):
+    return self.grid
+
+  @property
+  def nbytes(self):
+    return self.grid.nbytes
+
+
+class SparseOccupancy:
+  """Occupancy stored as a coordinate -> module hash map.
+
+  Vectorized lookups go through a sorted array of packed coordinates that is
+  rebuilt lazily after the map changes, so memory stays O(n) and coordinates
+  are not bounded by ``shape`` (which is only kept as a nominal extent).
+  """
+
+  def __init__(self, shape):
+    self.shape = tuple(shape)
+    self.cells = {}
+    self._dirty = True
+
+  def fill(self, module_positions):
+    modules, positions = position_items(module_positions)
+    self.cells = dict(zip(map(tuple, positions.tolist()), modules.tolist()))
+    self._dirty = True
+
+  def move(self, old_pos, new_pos, module):
+    del self.cells[tuple(old_pos)]
+    self.cells[tuple(new_pos)] = module
+    if not self._dirty:
+      self._move_key(pack_coords(old_pos), pack_coords(new_pos), module)
+
+  def _move_key(self, old_key, new_key, module):
+    # shift only the keys sorted between the old and new cell instead of re-sorting
+    keys, ids = self._keys, self._ids
+    i = np.searchsorted(keys, old_key)
+    j = np.searchsorted(keys, new_key)
+    if j > i:
+      keys[i:j-1] = keys[i+1:j]
+      ids[i:j-1] = ids[i+1:j]
+      keys[j-1], ids[j-1] = new_key, module
+    else:
+      keys[j+1:i+1] = keys[j:i]
+      ids[j+1:i+1] = ids[j:i]
+      keys[j], ids[j] = new_key, module
+
+  def _rebuild(self):
+    coords = np.array(list(self.cells.keys()), dtype=np.int64).reshape(-1, 3)
+    ids = np.fromiter(self.cells.values(), dtype=int, count=len(self.cells))
+    keys = pack_coords(coords)
+    order = np.argsort(keys)
+    self._keys = keys[order]
+    self._ids = ids[order]
+    self._dirty = False
+
+  def lookup(self, coords):
+    """Module numbers at coords, 0 for empty cells."""
+    if self._dirty:
+      self._rebuild()
+    keys = pack_coords(coords)
+    if len(self._keys) == 0:
+      return np.zeros(keys.shape, dtype=int)
+    idx = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+    return np.where(self._keys[idx] == keys, self._ids[idx], 0)
+
+  def occupied(self, coords):
+    """1 for occupied cells and 0 for empty ones."""
+    return (self.lookup(coords) > 0).astype(np.int8)
+
+  def fits(self, pos, margin=0):
+    """Whether pos is at least margin cells inside the packable coordinate range."""
+    return all(-PACK_BIAS + margin <= c < PACK_BIAS - margin for c in pos)
+
+  def equals(self, other):
+    return self.cells == other.cells
+
+  def to_array(self):
+    # debugging helper, materializes the nominal dense grid
+    grid = np.zeros(self.shape, dtype=grid_dtype(self.shape))
+    for pos, module in self.cells.items():
+      grid[pos] = module
+    return grid
+
+  @property
+  def nbytes(self):
+    if self._dirty:
+      self._rebuild()
+    return self._keys.nbytes + self._ids.nbytes
+
+
+class BitboardOccupancy:
+  """Occupancy stored as one bit per cell of a bounded grid.
+
+  Bits are packed into uint64 words in x, y, z order, so the whole occupancy
+  of a (2n+3)^3 grid takes 1/16 of the int16 dense grid. That is still
+  O(grid volume), about 1 GB per store at n=1000, so the words are never
+  copied or scanned: fill() only clears the words of the cells it set last
+  time, and snapshot() hashes the occupied bit indices, O(n) like the sparse
+  store. Module numbers are only needed for edges and connectivity and live
+  in a cell -> module dict; occupied() answers from the bits alone.
+  """
+
+  def __init__(self, shape):
+    self.shape = tuple(shape)
+    self.strides = np.array([self.shape[1] * self.shape[2], self.shape[2], 1])
+    self.words = np.zeros(-(-int(np.prod(self.shape)) // 64), dtype=np.uint64)
+    self.cells = {}
+
+  def _index(self, pos):
+    return (pos[0] * self.shape[1] + pos[1]) * self.shape[2] + pos[2]
+
+  def _flip(self, index):
+    self.words[index >> 6] ^= np.uint64(1 << (index & 63))
+
+  def fill(self, module_positions):
+    modules, positions = position_items(module_positions)
+    index = positions.astype(np.int64) @ self.strides
+    # every set bit belongs to a cell of the last fill or move, so clearing their words clears the board
+    if self.cells:
+      self.words[np.fromiter(self.cells, dtype=np.int64, count=len(self.cells)) >> 6] = 0
+    np.bitwise_or.at(self.words, index >> 6, np.uint64(1) << (index & 63).astype(np.uint64))
+    self.cells = dict(zip(index.tolist(), modules.tolist()))
+
+  def move(self, old_pos, new_pos, module):
+    old, new = self._index(old_pos), self._index(new_pos)
+    del self.cells[old]
+    self.cells[new] = module
+    self._flip(old)
+    self._flip(new)
+
+  def _bits(self, coords):
+    """Occupancy bits and in-bounds mask of integer (..., 3) coords."""
+    coords = np.asarray(coords)
+    shape = np.array(self.shape)
+    in_bounds = np.all((coords >= 0) & (coords < shape), axis=-1)
+    index = np.clip(coords, 0, shape - 1) @ self.strides
+    bits = (self.words[index >> 6] >> (index & 63).astype(np.uint64)) & np.uint64(1)
+    return bits.astype(bool) & in_bounds, in_bounds, index
+
+  def occupied(self, coords):
+    """1 for occupied cells, 0 for empty ones and -1 outside the grid."""
+    bits, in_bounds, _ = self._bits(coords)
+    return np.where(in_bounds, bits.astype(np.int8), np.int8(-1))
+
+  def lookup(self, coords):
+    """Module numbers at coords, 0 for empty cells and -1 outside the grid."""
+    bits, in_bounds, index = self._bits(coords)
+    ids = np.zeros(bits.shape, dtype=int)
+    ids[bits] = [self.cells[i] for i in index[bits].tolist()]
+    return np.where(in_bounds, ids, -1)
+
+  def fits(self, pos, margin=0):
+    """Whether pos is at least margin cells inside the grid."""
+    return all(margin <= c < size - margin for c, size in zip(pos, self.shape))
+
+  def snapshot(self):
+    """Sorted occupied bit indices as immutable bytes, equal exactly when the occupied cells are.
+
+    O(n) in size and to hash, whatever the grid volume. It holds occupancy
+    only, not which module sits where, so labelled search keys stay
+    get_state() and state_key().
+    """
+    return np.sort(np.fromiter(self.cells, dtype=np.int64, count=len(self.cells))).tobytes()
+
+  def equals(self, other):
+    return np.array_equal(self.words, other.words) and self.cells == other.cells
+
+  def to_array(self):
+    # debugging helper, materializes the dense grid
+    grid = np.zeros(self.shape, dtype=grid_dtype(self.shape))
+    for index, module in self.cells.items():
+      grid[np.unravel_index(index, self.shape)] = module
+    return grid
+
+  @property
+  def nbytes(self):
+    return self.words.nbytes
+
+
+OCCUPANCY_BACKENDS = {"dense": DenseOccupancy, "sparse": SparseOccupancy, "bitboard": BitboardOccupancy}
@@ -1,52 +1,133 @@
+import logging
+from time import perf_counter
+
 import numpy as np
+from ogm.occupancy import OCCUPANCY_BACKENDS
+from ogm.connectivity import ConnectivityTracker, CSRGraph
+from ogm.canonical import ROTATIONS, canonical_key
+from ogm.instrumentation import Stats
+from ogm.legal_actions import LegalActionSet
+from ogm.pivot_cache import NEIGHBORHOOD_OFFSETS, NEIGHBORHOOD_WEIGHTS, PIVOT_CACHE, PIVOT_CARE, unpack_pivots
+from ogm.positions import PositionView, to_position_array
+from ogm.pivots import PIVOT_DESTINATIONS, PIVOT_EXPECTED, PIVOT_OFFSETS, PIVOT_STEPS, PIVOT_VALID
+
+logger = logging.getLogger(__name__)
+
+# unit steps along +x, +y, +z used to find face neighbors
+UNIT_STEPS = np.eye(3, dtype=int)
+
+FRAMES = ("fixed", "relative")
+
+# cells a relative frame keeps between any module and the edge of the store, enough for a pivot window
+FRAME_MARGIN = 2
 
 class OccupancyGridMap:
-  def __init__(self, module_positions, final_module_positions, n):
+  def __init__(self, module_positions, final_module_positions, n, backend="dense", frame="fixed"):
     """Initialize the occupancy grid map with module positions.
     
     Args:
         module_positions: Dictionary mapping module numbers to their positions (x,y,z)
         final_module_positions: Dictionary mapping module numbers to their goal positions (x,y,z)
         n: Number of modules
+        backend: Occupancy store, "dense" for a (2n+3)^3 grid, "sparse" for a
+            coordinate hash map that only uses O(n) memory or "bitboard" for
+            a (2n+3)^3 grid packed one bit per cell
+        frame: "fixed" shifts every module after each move so module 1 stays at
+            recenter_to, "relative" leaves positions where they are and tracks
+            the drift of module 1 in origin, recentering only when a module
+            gets close to the edge of the occupancy store
     """
     # Validate inputs
     if not module_positions or not final_module_positions:
         raise ValueError("Module positions dictionaries cannot be empty")
     if n <= 0:
         raise ValueError("Number of modules must be positive")
+    if backend not in OCCUPANCY_BACKENDS:
+        raise ValueError(f"Unknown occupancy backend '{backend}', expected one of {list(OCCUPANCY_BACKENDS)}")
+    if frame not in FRAMES:
+      raise ValueError(f"Unknown frame '{frame}', expected one of {list(FRAMES)}")
     
-    # Store original module positions before recentering
-    self.original_module_positions = module_positions.copy()
-    self.original_final_module_positions = final_module_positions.copy()
+    if 1 not in module_positions:
+        raise ValueError("Module 1 must exist in the module positions dictionary")
+
+    # Store original module positions before recentering, as (n, 3) arrays with dict views
+    self.original_positions = to_position_array(module_positions, n)
+    self.original_final_positions = to_position_array(final_module_positions, n)
+    self.original_module_positions = PositionView(self.original_positions)
+    self.original_final_module_positions = PositionView(self.original_final_positions)
     
     # Calculate grid size based on number of modules
     grid_size = self.calculate_grid_size(n)
     
-    # Create grid maps with appropriate size
-    self.grid_map = np.zeros((grid_size, grid_size, grid_size))
-    self.curr_grid_map = np.zeros((grid_size, grid_size, grid_size))
-    self.final_grid_map = np.zeros((grid_size, grid_size, grid_size))
-    
-    # Recenter module positions so that module 1 is at the center of the grid
-    self.module_positions, self.final_module_positions = self.recenter_initial_positions(
-        module_positions, final_module_positions, grid_size)
+    # per-stage counters and timers, see ogm.instrumentation
+    self.stats = Stats()
+
+    # Create occupancy stores with appropriate size
+    self.backend = backend
+    self.frame = frame
+    self.grid_shape = (grid_size, grid_size, grid_size)
+    store = OCCUPANCY_BACKENDS[backend]
+    self.initial_occupancy = store(self.grid_shape)
+    self.occupancy = store(self.grid_shape)
+    self.final_occupancy = store(self.grid_shape)
     
-    # Initialize grid maps with recentered module positions
-    for module, pos in self.module_positions.items():
-        self.grid_map[pos[0], pos[1], pos[2]] = module
-        self.curr_grid_map[pos[0], pos[1], pos[2]] = module
+    # Recenter module positions so that module 1 is at the center of the grid;
+    # positions[m-1] holds module m, module_positions is its dict view
+    self.positions, self.final_positions = self.recenter_initial_positions(
+        self.original_positions, self.original_final_positions, grid_size)
+    self._module_positions = PositionView(self.positions)
+    self._final_module_positions = PositionView(self.final_positions)
     
-    for module, pos in self.final_module_positions.items():
-        self.final_grid_map[pos[0], pos[1], pos[2]] = module
+    # Initialize occupancy with recentered module positions
+    self.initial_occupancy.fill(self.module_positions)
+    self.occupancy.fill(self.module_positions)
+    self.final_occupancy.fill(self.final_module_positions)
     
     # Set reference position for recentering during operations
     self.recenter_to = self.module_positions[1]
+    self.anchor = self.positions[0].copy()
     self.modules = range(1, n+1)
-    self.edges = self.calculate_edges(self.modules, self.module_positions)
+    self.connectivity = ConnectivityTracker(self.occupancy, self.module_positions, self.stats)
+    # optional ogm.trajectory.TrajectoryRecorder that logs every take_action
+    self.recorder = None
     self.rotation_matrices()
     self.init_actions()
-
-  def calculate_grid_size(self, n):
+    # legal moves, re-evaluated only around each move
+    self.legal_set = LegalActionSet(self)
+
+  # dict views of the position arrays, kept for callers written against dicts of tuples
+  @property
+  def module_positions(self):
+    return self._module_positions
+
+  @module_positions.setter
+  def module_positions(self, module_positions):
+    self.positions[:] = to_position_array(module_positions, len(self.positions))
+
+  @property
+  def final_module_positions(self):
+    return self._final_module_positions
+
+  # dense views of the occupancy stores, kept for callers that index the grids directly
+  @property
+  def grid_map(self):
+    return self.initial_occupancy.to_array()
+
+  @property
+  def curr_grid_map(self):
+    return self.occupancy.to_array()
+
+  @property
+  def final_grid_map(self):
+    return self.final_occupancy.to_array()
+
+  # edges as [m-1, n-1] pairs, maintained incrementally by the connectivity tracker
+  @property
+  def edges(self):
+    return self.connectivity.edges
+
+  @staticmethod
+  def calculate_grid_size(n):
     """Calculate grid size based on number of modules.
     
     Args:
@@ -60,456 +141,206 @@ class OccupancyGridMap:
     # Using n*2+3 as a simple scaling formula
     return max(5, n*2+3)
   
-  def recenter_initial_positions(self, module_positions, final_module_positions, grid_size):
+  def recenter_initial_positions(self, positions, final_positions, grid_size):
     """Recenter module positions so that module 1 is at the center of the grid.
     
     Args:
-        module_positions: Original module positions dictionary
-        final_module_positions: Original final module positions dictionary
+        positions: (n, 3) original module positions
+        final_positions: (n, 3) original final module positions
         grid_size: Size of the grid
         
     Returns:
-        Tuple of (recentered module positions, recentered final module positions)
+        Tuple of (recentered positions, recentered final positions), new arrays
     """
-    # Calculate center of the grid
-    grid_center = grid_size // 2
-    
-    # Get position of module 1
-    if 1 not in module_positions:
-        raise ValueError("Module 1 must exist in the module positions dictionary")
-    
-    module1_pos = module_positions[1]
-    
-    # Calculate offset to move module 1 to grid center
-    offset = (
-        grid_center - module1_pos[0],
-        grid_center - module1_pos[1],
-        grid_center - module1_pos[2]
-    )
-    
-    # Apply offset to all module positions
-    recentered_positions = {}
-    for module, pos in module_positions.items():
-        recentered_positions[module] = (
-            pos[0] + offset[0],
-            pos[1] + offset[1],
-            pos[2] + offset[2]
-        )
-    
-    # Apply offset to all final module positions
-    recentered_final_positions = {}
-    for module, pos in final_module_positions.items():
-        recentered_final_positions[module] = (
-            pos[0] + offset[0],
-            pos[1] + offset[1],
-            pos[2] + offset[2]
-        )
-    
-    return recentered_positions, recentered_final_positions
+    # Offset moving module 1 to the grid center, applied to both configurations
+    offset = grid_size // 2 - positions[0]
+    return positions + offset, final_positions + offset
+
+  # offset of the current frame from the anchored one, module 1 sits at recenter_to + origin
+  @property
+  def origin(self):
+    return self.positions[0] - self.anchor
 
   # recenter the grid_map so that a module (the first one for now) is at (0,0,0)
   def recenter(self):
     # recenter to a position (NOT the origin)
-    #ipdb.set_trace()
-    curr_pos = self.module_positions[1]
-    offset = (curr_pos[0] - self.recenter_to[0], curr_pos[1] - self.recenter_to[1], curr_pos[2] - self.recenter_to[2])
-    self.curr_grid_map = np.zeros(self.curr_grid_map.shape)
+    t0 = perf_counter()
+    offset = self.positions[0] - self.anchor
+    if not offset.any():
+      return
+
+    self.positions -= offset
+    self.occupancy.fill(self.module_positions)
+    self.legal_set.rebuild()
+    self.stats.record("recentering", t0)
+
+  def get_state(self):
+    """Module positions as an (n, 3) array ordered by module number, module 1 at recenter_to."""
+    return self.positions - self.origin
+
+  def set_state(self, positions):
+    """Jump to a configuration previously returned by get_state (module 1 at recenter_to)."""
+    t0 = perf_counter()
+    self.positions[:] = positions
+    self.occupancy.fill(self.module_positions)
+    self.connectivity.rebuild(self.module_positions)
+    self.legal_set.rebuild()
+    if self.recorder is not None:
+      self.recorder.reset()
+    self.stats.record("set_state", t0)
+
+  # pivot rules are compiled once per process in ogm.pivots, a map only keeps references to them
+  def init_actions(self):
+    self.pivot_offsets = PIVOT_OFFSETS
+    self.pivot_expected = PIVOT_EXPECTED
+    self.pivot_valid = PIVOT_VALID
+    self.pivot_destinations = PIVOT_DESTINATIONS
+    # neighborhood key -> legal pivots, shared by all maps unless replaced
+    self.pivot_cache = PIVOT_CACHE
 
-    for module in self.modules:
-      temp_mod = self.module_positions[module]
-      new_pos = (temp_mod[0] - offset[0], temp_mod[1] - offset[1], temp_mod[2] - offset[2])
-      self.module_positions[module] = new_pos
-      self.curr_grid_map[new_pos[0], new_pos[1], new_pos[2]] = module
+  def pivot_rows(self, positions):
+    """Legal pivots of modules at positions from their 48-cell neighborhoods, articulation points ignored.
 
+    Each module's neighborhood is gathered in one lookup and packed into a
+    48-bit key, and the legal pivots of each distinct key come from
+    pivot_cache (see ogm.pivot_cache), so only patterns not seen before are
+    checked against the pivot table.
 
-  # probably need each module to track its own position so that they can be easily recentered
+    Args:
+        positions: (k, 3) module positions
 
-  # define possible actions in terms of a dictionary of a list of vectors from module to other necessary modules and a list of vectors from module to necessary empty spaces for keys, and values are vectors where the module ends up.
-  # actually use the slices as in the problem formulation. possible_actions is a dictionary with modules as keys and a 48 boolean long list as values.
-  def init_actions(self):
-    self.potential_pivots = {1: np.array([[True, True, False], [True, False, False]]), #fixed
-                             2: np.array([[True, True, False], [False, False, False], [False, False, False]]), #fixed
-                             3: np.array([[False, True, True], [False, False, True]]), #fixed
-                             4: np.array([[False, True, True], [False, False, False], [False, False, False]]), #fixed
-                             5: np.array([[False, False], [True, False], [True, True]]), #fixed
-                             6: np.array([[False, False, False], [True, False, False], [True, False, False]]), #fixed
-                             7: np.array([[False, False], [False, True], [True, True]]), #fixed
-                             8: np.array([[False, False, False], [False, False, True], [False, False, True]]), #fixed
-                             9: np.array([[True, False, False], [True, True, False]]), #fixed
-                             10: np.array([[False, False, False], [False, False, False], [True, True, False]]), #fixed
-                             11: np.array([[False, False, True], [False, True, True]]), #fixed
-                             12: np.array([[False, False, False], [False, False, False], [False, True, True]]), #fixed
-                             13: np.array([[True, True], [True, False], [False, False]]), #fixed
-                             14: np.array([[True, False, False], [True, False, False], [False, False, False]]), #fixed
-                             15: np.array([[True, True], [False, True], [False, False]]), #fixed
-                             16: np.array([[False, False, True], [False, False, True], [False, False, False]]), #fixed
-                             17: np.array([[True, True, False], [True, False, False]]), #fixed
-                             18: np.array([[True, True, False], [False, False, False], [False, False, False]]), #fixed
-                             19: np.array([[False, True, True], [False, False, True]]), #fixed
-                             20: np.array([[False, True, True], [False, False, False], [False, False, False]]), #fixed
-                             21: np.array([[False, False], [True, False], [True, True]]), #fixed
-                             22: np.array([[False, False, False], [True, False, False], [True, False, False]]), #fixed
-                             23: np.array([[False, False], [False, True], [True, True]]), #fixed
-                             24: np.array([[False, False, False], [False, False, True], [False, False, True]]), #fixed
-                             25: np.array([[True, False, False], [True, True, False]]), #fixed
-                             26: np.array([[False, False, False], [False, False, False], [True, True, False]]), #fixed
-                             27: np.array([[False, False, True], [False, True, True]]), #fixed
-                             28: np.array([[False, False, False], [False, False, False], [False, True, True]]), #fixed
-                             29: np.array([[True, True], [True, False], [False, False]]), #fixed
-                             30: np.array([[True, False, False], [True, False, False], [False, False, False]]), #fixed
-                             31: np.array([[True, True], [False, True], [False, False]]), #fixed
-                             32: np.array([[False, False, True], [False, False, True], [False, False, False]]), #fixed
-                             33: np.array([[True, True, False], [True, False, False]]), #fixed
-                             34: np.array([[True, True, False], [False, False, False], [False, False, False]]), #fixed
-                             35: np.array([[False, True, True], [False, False, True]]), #fixed
-                             36: np.array([[False, True, True], [False, False, False], [False, False, False]]), #fixed
-                             37: np.array([[False, False], [True, False], [True, True]]), #fixed
-                             38: np.array([[False, False, False], [True, False, False], [True, False, False]]), #fixed
-                             39: np.array([[False, False], [False, True], [True, True]]), #fixed
-                             40: np.array([[False, False, False], [False, False, True], [False, False, True]]), #fixed
-                             41: np.array([[True, False, False], [True, True, False]]), #fixed
-                             42: np.array([[False, False, False], [False, False, False], [True, True, False]]), #fixed
-                             43: np.array([[False, False, True], [False, True, True]]), #fixed
-                             44: np.array([[False, False, False], [False, False, False], [False, True, True]]), #fixed
-                             45: np.array([[True, True], [True, False], [False, False]]), #fixed
-                             46: np.array([[True, False, False], [True, False, False], [False, False, False]]), #fixed
-                             47: np.array([[True, True], [False, True], [False, False]]), #fixed
-                             48: np.array([[False, False, True], [False, False, True], [False, False, False]]) #fixed
-                             }
-
-    # 3 rows for x, y, z, respectively, with start, stop
-    self.ranges = {1: np.array([[0,1], [-1,1], [0,0]]),
-                   2: np.array([[0,2], [-1,1], [0,0]]),
-                   3: np.array([[0,1], [-1,1], [0,0]]),
-                   4: np.array([[0,2], [-1,1], [0,0]]),
-                   5: np.array([[-1,1], [0,1], [0,0]]),
-                   6: np.array([[-1,1], [0,2], [0,0]]),
-                   7: np.array([[-1,1], [-1,0], [0,0]]), # does the negative stuff work?
-                   8: np.array([[-1,1], [-2,0], [0,0]]), # does the negative stuff work?
-                   9: np.array([[-1,0], [-1,1], [0,0]]),
-                   10: np.array([[-2,0], [-1,1], [0,0]]),
-                   11: np.array([[-1,0], [-1,1], [0,0]]),
-                   12: np.array([[-2,0], [-1,1], [0,0]]),
-                   13: np.array([[-1,1], [0,1], [0,0]]),
-                   14: np.array([[-1,1], [0,2], [0,0]]),
-                   15: np.array([[-1,1], [-1,0], [0,0]]), # does the negative stuff work?
-                   16: np.array([[-1,1], [-2,0], [0,0]]), # does the negative stuff work? # now switch which dimension stays the same
-                   17: np.array([[0,1], [0,0], [-1,1]]),
-                   18: np.array([[0,2], [0,0], [-1,1]]),
-                   19: np.array([[0,1], [0,0], [-1,1]]),
-                   20: np.array([[0,2], [0,0], [-1,1]]),
-                   21: np.array([[-1,1], [0,0], [0,1]]),
-                   22: np.array([[-1,1], [0,0], [0,2]]),
-                   23: np.array([[-1,1], [0,0], [-1,0]]), # does the negative stuff work?
-                   24: np.array([[-1,1], [0,0], [-2,0]]), # does the negative stuff work?
-                   25: np.array([[-1,0], [0,0], [-1,1]]),
-                   26: np.array([[-2,0], [0,0], [-1,1]]),
-                   27: np.array([[-1,0], [0,0], [-1,1]]),
-                   28: np.array([[-2,0], [0,0], [-1,1]]),
-                   29: np.array([[-1,1], [0,0], [0,1]]),
-                   30: np.array([[-1,1], [0,0], [0,2]]),
-                   31: np.array([[-1,1], [0,0], [-1,0]]), # does the negative stuff work?
-                   32: np.array([[-1,1], [0,0], [-2,0]]), # does the negative stuff work? # now switch which dimension stays the same
-                   33: np.array([[0,0], [0,1], [-1,1]]),
-                   34: np.array([[0,0], [0,2], [-1,1]]),
-                   35: np.array([[0,0], [0,1], [-1,1]]),
-                   36: np.array([[0,0], [0,2], [-1,1]]),
-                   37: np.array([[0,0], [-1,1], [0,1]]),
-                   38: np.array([[0,0], [-1,1], [0,2]]),
-                   39: np.array([[0,0], [-1,1], [-1,0]]), # does the negative stuff work?
-                   40: np.array([[0,0], [-1,1], [-2,0]]), # does the negative stuff work?
-                   41: np.array([[0,0], [-1,0], [-1,1]]),
-                   42: np.array([[0,0], [-2,0], [-1,1]]),
-                   43: np.array([[0,0], [-1,0], [-1,1]]),
-                   44: np.array([[0,0], [-2,0], [-1,1]]),
-                   45: np.array([[0,0], [-1,1], [0,1]]),
-                   46: np.array([[0,0], [-1,1], [0,2]]),
-                   47: np.array([[0,0], [-1,1], [-1,0]]), # does the negative stuff work?
-                   48: np.array([[0,0], [-1,1], [-2,0]]) # does the negative stuff work? # now switch which dimension stays the same
-                   }
-
-    self.negative_y_ranges = {7,8,15,16}
-    self.negative_y_ranges = {}
-    self.negative_z_ranges = {23,24,31,32,39,40,47,48}
-    self.negative_z_ranges = {}
+    Returns:
+        (k, 48) boolean array
+    """
+    cells = self.occupancy.occupied(np.asarray(positions)[:, None, :] + NEIGHBORHOOD_OFFSETS)
+    keys = (cells > 0).astype(np.int64) @ NEIGHBORHOOD_WEIGHTS
+
+    hits, misses = self.pivot_cache.hits, self.pivot_cache.misses
+    mask = unpack_pivots(self.pivot_cache.masks(keys))
+    self.stats.count("pivot_cache_hits", self.pivot_cache.hits - hits)
+    self.stats.count("pivot_cache_misses", self.pivot_cache.misses - misses)
+
+    # windows that stick out of the grid (-1) are never legal
+    outside = cells < 0
+    if outside.any():
+      outside_keys = outside.astype(np.int64) @ NEIGHBORHOOD_WEIGHTS
+      mask &= (outside_keys[:, None] & PIVOT_CARE) == 0
+    return mask
+
+  def legal_action_mask(self, articulation_points=()):
+    """Evaluate every (module, pivot) pair from scratch.
+
+    Args:
+        articulation_points: Modules that are not allowed to move
+
+    Returns:
+        (n, 48) boolean array, row m-1 holds the legal pivots of module m
+    """
+    t0 = perf_counter()
+    mask = self.pivot_rows(self.positions)
+    for m in articulation_points:
+      if m in self.modules:
+        mask[m - 1] = False
+    self.stats.record("pivot_checks", t0)
+    return mask
+
+  def legal_actions(self):
+    """(n, 48) legal pivot mask of the current configuration, articulation points included.
+
+    This is the live, read-only view of legal_set (see ogm.legal_actions):
+    it is kept up to date across moves, so copy it to keep a snapshot.
+    """
+    mask = self.legal_set.mask
+    self.articulation_points = self.legal_set.articulation_points
+    logger.debug("articulation_points %s", self.articulation_points)
+    return mask
 
   def calc_possible_actions(self): # need to check now that neighbor is free
-    self.possible_actions = {}
-    self.articulation_points = set(self.articulationPoints(len(self.modules), self.edges))
-    print("articulation_points\n")
-    print(self.articulation_points)
-
-    for m in self.modules:
-      #ipdb.set_trace()
-      self.possible_actions[m] = np.array(list(range(48))) > 49
-
-      if m not in self.articulation_points:
-        module_position = self.module_positions[m]
-
-        # will go to 48
-        for p in range(1, 49):
-          #ipdb.set_trace()
-          rangethingy = self.ranges[p]
-          offset_x = module_position[0] + rangethingy[0]
-          offset_y = module_position[1] + rangethingy[1]
-          offset_z = module_position[2] + rangethingy[2]
-
-          if p in self.negative_y_ranges:
-            sliced = self.curr_grid_map[offset_x[0]:(offset_x[1] + 1), offset_y[0]:(None if offset_y[1]==0 else offset_y[1] - 1):-1, offset_z[0]:(offset_z[1] + 1)]
-          elif p in self.negative_z_ranges:
-            sliced = self.curr_grid_map[offset_x[0]:(offset_x[1] + 1), offset_y[0]:(offset_y[1] + 1), offset_z[0]:(None if offset_z[1]==0 else offset_z[1] - 1):-1]
-          else:
-            sliced = self.curr_grid_map[offset_x[0]:(offset_x[1] + 1), offset_y[0]:(offset_y[1] + 1), offset_z[0]:(offset_z[1] + 1)]
-
-          booled = np.squeeze(sliced > 0)
-          pa = self.possible_actions[m]
-          pa[p - 1] = np.all(booled == self.potential_pivots[p])
-          self.possible_actions[m] = pa
-          #print(p)
-          #ipdb.set_trace()
-    print(f"Possible actions: ")
-    #print(self.possible_actions)
-
-    for m in self.modules:
-      print(np.where(self.possible_actions[m])[0] + 1)
+    self.possible_actions_mask = self.legal_actions()
+    self.possible_actions = {m: self.possible_actions_mask[m - 1].copy() for m in self.modules}
+
+    if logger.isEnabledFor(logging.DEBUG):
+      for m in self.modules:
+        logger.debug("Possible actions of module %d: %s", m, np.where(self.possible_actions[m])[0] + 1)
 
     return self.possible_actions
 
+  def pivot_destination(self, module_position, action):
+    """Cell a module at module_position ends up in after pivot action (1-48)."""
+    dx, dy, dz = PIVOT_STEPS[action - 1]
+    return (module_position[0] + dx, module_position[1] + dy, module_position[2] + dz)
+
   def take_action(self, module, action):
+    _, _, new_module_position, _ = self.apply(module, action)
+    # a relative frame only pays for a recenter when the moved module nears the edge of the store
+    if self.frame == "fixed" or not self.occupancy.fits(new_module_position, FRAME_MARGIN):
+      self.recenter()
+    if self.recorder is not None:
+      self.recorder.record(module, action)
+    logger.debug("Module Positions: %s", self.module_positions)
+
+  def apply(self, module, action):
+    """Pivot a module in place and return a token for revert().
+
+    Only the module's cell, its edges and the connectivity caches around it
+    change, nothing is reallocated. Unlike take_action the frame is never
+    re-anchored on module 1, compare states through state_key() instead.
+    Tokens must be reverted in the reverse order they were applied.
+    """
     module_position = self.module_positions[module]
-
-    match action:
-      case 1:
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2])
-      case 2:
-        new_module_position = (module_position[0] + 1, module_position[1] - 1, module_position[2])
-      case 3:#
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2])
-      case 4:
-        new_module_position = (module_position[0] + 1, module_position[1] + 1, module_position[2])
-      case 5:
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2])
-      case 6:
-        new_module_position = (module_position[0] + 1, module_position[1] + 1, module_position[2])
-      case 7:
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2])
-      case 8:
-        new_module_position = (module_position[0] + 1, module_position[1] - 1, module_position[2])
-      case 9:
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2])
-      case 10:
-        new_module_position = (module_position[0] - 1, module_position[1] - 1, module_position[2])
-      case 11:
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2])
-      case 12:#
-        new_module_position = (module_position[0] - 1, module_position[1] + 1, module_position[2])
-      case 13:
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2])
-      case 14:
-        new_module_position = (module_position[0] - 1, module_position[1] + 1, module_position[2])
-      case 15:
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2])
-      case 16:#####################
-        new_module_position = (module_position[0] - 1, module_position[1] - 1, module_position[2])
-      case 17:
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2])
-      case 18:
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2] - 1) #fixed
-      case 19:#
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2])
-      case 20:
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2] + 1) #fixed
-      case 21:
-        new_module_position = (module_position[0], module_position[1], module_position[2] + 1) #fixed
-      case 22:
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2] + 1) #fixed
-      case 23:
-        new_module_position = (module_position[0], module_position[1], module_position[2] - 1) #fixed
-      case 24:
-        new_module_position = (module_position[0] + 1, module_position[1], module_position[2] - 1)
-      case 25:
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2])
-      case 26:
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2] - 1)
-      case 27:
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2])
-      case 28:#
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2] + 1)
-      case 29:
-        new_module_position = (module_position[0], module_position[1], module_position[2] + 1)
-      case 30:
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2] + 1)
-      case 31:
-        new_module_position = (module_position[0], module_position[1], module_position[2] - 1)
-      case 32:#####################
-        new_module_position = (module_position[0] - 1, module_position[1], module_position[2] - 1)
-      case 33:
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2])
-      case 34:
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2] - 1)
-      case 35:#
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2])
-      case 36:
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2] + 1)
-      case 37:
-        new_module_position = (module_position[0], module_position[1], module_position[2] + 1)
-      case 38:
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2] + 1) 
-      case 39:
-        new_module_position = (module_position[0], module_position[1], module_position[2] - 1)
-      case 40:
-        new_module_position = (module_position[0], module_position[1] + 1, module_position[2] - 1)
-      case 41:
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2])
-      case 42:
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2] - 1)
-      case 43:
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2])
-      case 44:#
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2] + 1)
-      case 45:
-        new_module_position = (module_position[0], module_position[1], module_position[2] + 1)
-      case 46:
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2] + 1)
-      case 47:
-        new_module_position = (module_position[0], module_position[1], module_position[2] - 1)
-      case 48:#####################
-        new_module_position = (module_position[0], module_position[1] - 1, module_position[2] - 1)
-
-
-    self.curr_grid_map[module_position[0], module_position[1], module_position[2]] = 0
-    self.curr_grid_map[new_module_position[0], new_module_position[1], new_module_position[2]] = module
-    self.module_positions[module] =new_module_position
-    self.recenter()
-    self.edges = self.calculate_edges(self.modules, self.module_positions)
-    
-    print(f"Module Positions: {self.module_positions}")
-    #print(f"Curr Grid Map: {self.curr_grid_map}")
-
+    new_module_position = self.pivot_destination(module_position, action)
+
+    self.occupancy.move(module_position, new_module_position, module)
+    self.positions[module - 1] = new_module_position
+    t0 = perf_counter()
+    undo = self.connectivity.move(module, module_position, new_module_position)
+    self.stats.record("edges", t0)
+    self.legal_set.moved(module_position, new_module_position)
+    return (module, module_position, new_module_position, undo)
+
+  def revert(self, token):
+    module, module_position, new_module_position, undo = token
+    self.connectivity.undo(undo)
+    self.occupancy.move(new_module_position, module_position, module)
+    self.positions[module - 1] = module_position
+    self.legal_set.moved(new_module_position, module_position)
+
+  # goal configurations are equivalent under translation and any of the 24 cube rotations,
+  # so the goal is stored once as a canonical key
   def rotation_matrices(self):
-    rx1 = np.array([[1, 0, 0], [0, np.cos(np.pi / 2), -np.sin(np.pi / 2)], [0, np.sin(np.pi / 2), np.cos(np.pi / 2)]])
-    rx2 = np.array([[1, 0, 0], [0, np.cos(np.pi), -np.sin(np.pi)], [0, np.sin(np.pi), np.cos(np.pi)]])
-    rx3 = np.array([[1, 0, 0], [0, np.cos(3 * np.pi / 2), -np.sin(3 * np.pi / 2)], [0, np.sin(3 * np.pi / 2), np.cos(3 * np.pi / 2)]])
-    ry1 = np.array([[np.cos(np.pi / 2), 0, np.sin(np.pi / 2)], [0, 1, 0], [-np.sin(np.pi / 2), 0, np.cos(np.pi / 2)]])
-    ry2 = np.array([[np.cos(np.pi), 0, np.sin(np.pi)], [0, 1, 0], [-np.sin(np.pi), 0, np.cos(np.pi)]])
-    ry3 = np.array([[np.cos(3 * np.pi / 2), 0, np.sin(3 * np.pi / 2)], [0, 1, 0], [-np.sin(3 * np.pi / 2), 0, np.cos(3 * np.pi / 2)]])
-    rz1 = np.array([[np.cos(np.pi / 2), -np.sin(np.pi / 2), 0], [np.sin(np.pi / 2), np.cos(np.pi / 2), 0], [0, 0, 1]])
-    rz2 = np.array([[np.cos(np.pi), -np.sin(np.pi), 0], [np.sin(np.pi), np.cos(np.pi), 0], [0, 0, 1]])
-    rz3 = np.array([[np.cos(3 * np.pi / 2), -np.sin(3 * np.pi / 2), 0], [np.sin(3 * np.pi / 2), np.cos(3 * np.pi / 2), 0], [0, 0, 1]])
-
-    self.rotmats = [rx1, rx2, rx3, ry1, ry2, ry3, rz1, rz2, rz3]
-    self.final_grid_maps = [self.final_grid_map]
-
-    for i in range(9):
-      temp_grid_map = np.zeros(self.curr_grid_map.shape)
-      rotmat = self.rotmats[i]
+    self.rotmats = list(ROTATIONS)
+    self.goal_key = canonical_key(self.final_positions)
 
-      for m in self.modules:
-        temp_pos = self.final_module_positions[m]
-        temp_pos = np.subtract(temp_pos, self.recenter_to)
-        new_pos = np.matmul(rotmat, temp_pos)
-        new_pos = np.rint(new_pos)
-        new_pos = new_pos.astype(int)
-        new_pos = np.add(new_pos, self.recenter_to)
-        #ipdb.set_trace()
-        temp_grid_map[new_pos[0], new_pos[1], new_pos[2]] = m
-
-      self.final_grid_maps.append(temp_grid_map)
-    # print(f"Final grid maps: {self.final_grid_maps}")
+  def state_key(self):
+    """Canonical key of the current configuration, shared by goal checks and visited sets."""
+    return canonical_key(self.positions)
 
   def check_final(self):
-    #ipdb.set_trace()
-    for i in range(len(self.final_grid_maps)):
-      if np.all(self.curr_grid_map == self.final_grid_maps[i]):
-        return True
-    return False
-    #return np.all(self.curr_grid_map == self.final_grid_map)
-  # need to check relative positions of modules, maybe with a connectivity graph
+    t0 = perf_counter()
+    reached = self.state_key() == self.goal_key
+    self.stats.record("goal_checks", t0)
+    return reached
 
   # need to calculate edges first
+  # module_positions must match the current occupancy, neighbors are looked up in it
   def calculate_edges(self, modules, module_positions):
-    edges = []
-
-    for m in modules:
-      for n in range(m + 1, len(modules) + 1):
-        pos_m = module_positions[m]
-        pos_n = module_positions[n]
+    modules = np.asarray(modules)
+    positions = np.array([module_positions[m] for m in modules.tolist()]).reshape(-1, 3)
+    neighbors = self.occupancy.lookup(positions[:, None, :] + UNIT_STEPS)
 
-        if np.sum(np.abs(np.subtract(pos_m, pos_n))) == 1:
-          edges.append([m-1,n-1])
+    i, j = np.nonzero(neighbors > 0)
+    m, u = modules[i], neighbors[i, j]
+    pairs = np.stack([np.minimum(m, u), np.maximum(m, u)], axis=1) - 1
+    edges = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))].tolist()
 
-    print("edges:")
-    print(edges)
+    logger.debug("edges: %s", edges)
     return edges
 
 
-  def constructAdj(self, V, edges):
-      adj = [[] for _ in range(V)]
-
-      for edge in edges:
-          adj[edge[0]].append(edge[1])
-          adj[edge[1]].append(edge[0])
-      return adj
-
-  # Helper function to perform DFS and find articulation points
-  # using Tarjan's algorithm.
-  def findPoints(self, adj, u, visited, disc, low, time, parent, isAP):
-
-      # Mark vertex u as visited and assign discovery
-      # time and low value
-      visited[u] = 1
-      time[0] += 1
-      disc[u] = low[u] = time[0]
-      children = 0
-
-      # Process all adjacent vertices of u
-      for v in adj[u]:
-
-          # If v is not visited, then recursively visit it
-          if not visited[v]:
-              children += 1
-              self.findPoints(adj, v, visited, disc, low, time, u, isAP)
-
-              # Check if the subtree rooted at v has a
-              # connection to one of the ancestors of u
-              low[u] = min(low[u], low[v])
-
-              # If u is not a root and low[v] is greater than or equal to disc[u],
-              # then u is an articulation point
-              if parent != -1 and low[v] >= disc[u]:
-                  isAP[u] = 1
-
-          # Update low value of u for back edge
-          elif v != parent:
-              low[u] = min(low[u], disc[v])
-
-      # If u is root of DFS tree and has more than
-      # one child, it is an articulation point
-      if parent == -1 and children > 1:
-          isAP[u] = 1
-
-  # Main function to find articulation points in the graph
   def articulationPoints(self, V, edges):
+    """Articulation points (module numbers) of a V-vertex graph given as [m-1, n-1] edges.
 
-      #ipdb.set_trace()
-      adj = self.constructAdj(V, edges)
-      print("adjacency:")
-      print(adj)
-      disc = [0] * V
-      low = [0] * V
-      visited = [0] * V
-      isAP = [0] * V
-      time = [0]
-
-      # Run DFS from each vertex if not
-      # already visited (to handle disconnected graphs)
-      for u in range(V):
-          if not visited[u]:
-              self.findPoints(adj, u, visited, disc, low, time, -1, isAP)
-
-      # Collect all vertices that are articulation points
-      result = [u for u in range(V) if isAP[u]]
-      result = [x+1 for x in result]
-
-      # If no articulation points are found, return list containing -1
-      return result if result else [-1]
+    Non-recursive, see CSRGraph. Returns [-1] if there are none.
+    """
+    result = sorted(CSRGraph.from_edges(V, edges).articulation_points())
+    return result if result else [-1]
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+
+import numpy as np
+from ogm.pivots import PIVOT_EXPECTED, PIVOT_OFFSETS, PIVOT_VALID
+
+# The 48 cells around a module that any pivot window reads, the module's own
+# cell excluded since it is always occupied. Bit i of a neighborhood key is
+# set when NEIGHBORHOOD_OFFSETS[i] is occupied.
+NEIGHBORHOOD_OFFSETS = np.array(sorted({tuple(c) for c in PIVOT_OFFSETS[PIVOT_VALID].tolist()} - {(0, 0, 0)}))
+NEIGHBORHOOD_BITS = len(NEIGHBORHOOD_OFFSETS)
+NEIGHBORHOOD_WEIGHTS = np.int64(1) << np.arange(NEIGHBORHOOD_BITS, dtype=np.int64)
+
+ACTION_BITS = PIVOT_OFFSETS.shape[0]
+ACTION_WEIGHTS = np.int64(1) << np.arange(ACTION_BITS, dtype=np.int64)
+
+
+def _window_bits():
+  """(48, 9) bit of every pivot window cell, -1 for the module's own cell and padding."""
+  index = {tuple(c): i for i, c in enumerate(NEIGHBORHOOD_OFFSETS.tolist())}
+  bits = np.full(PIVOT_VALID.shape, -1)
+  for p, w in zip(*np.nonzero(PIVOT_VALID)):
+    bits[p, w] = index.get(tuple(PIVOT_OFFSETS[p, w].tolist()), -1)
+  return bits
+
+
+WINDOW_BITS = _window_bits()
+
+
+def _pivot_masks():
+  """(48,) must-be-set and must-be-clear neighborhood masks of every action."""
+  must_set = np.zeros(ACTION_BITS, dtype=np.int64)
+  must_clear = np.zeros(ACTION_BITS, dtype=np.int64)
+  for p, w in zip(*np.nonzero(WINDOW_BITS >= 0)):
+    bit = np.int64(1) << WINDOW_BITS[p, w]
+    if PIVOT_EXPECTED[p, w]:
+      must_set[p] |= bit
+    else:
+      must_clear[p] |= bit
+  return must_set, must_clear
+
+
+PIVOT_MUST_SET, PIVOT_MUST_CLEAR = _pivot_masks()
+# every neighborhood bit an action reads
+PIVOT_CARE = PIVOT_MUST_SET | PIVOT_MUST_CLEAR
+
+
+def legal_pivots(keys):
+  """48-bit legal pivot masks (bit a for action a+1) of neighborhood keys, ignoring articulation points."""
+  keys = np.asarray(keys, dtype=np.int64)
+  legal = (keys[:, None] & PIVOT_CARE) == PIVOT_MUST_SET
+  return legal.astype(np.int64) @ ACTION_WEIGHTS
+
+
+def unpack_pivots(masks):
+  """(K,) 48-bit masks as a (K, 48) boolean array."""
+  return (np.asarray(masks, dtype=np.int64)[:, None] >> np.arange(ACTION_BITS)) & 1 == 1
+
+
+class PivotCache:
+  """LRU map from neighborhood keys to 48-bit legal pivot masks.
+
+  Legality of a pivot only depends on which of the 48 cells around the module
+  are occupied (and on articulation points, which are masked separately), and
+  the same few local patterns recur throughout a search. A lookup therefore
+  costs one gather of 48 cells per module and one dict access per distinct
+  pattern, and only patterns never seen before are evaluated against the
+  pivot table. Hits and misses are counted for hit_rate.
+  """
+
+  def __init__(self, maxsize=1 << 16):
+    if maxsize <= 0:
+      raise ValueError("maxsize must be positive")
+    self.maxsize = maxsize
+    self.entries = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+  def __len__(self):
+    return len(self.entries)
+
+  @property
+  def hit_rate(self):
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.0
+
+  def clear(self):
+    self.entries.clear()
+    self.hits = 0
+    self.misses = 0
+
+  def masks(self, keys):
+    """48-bit legal pivot masks of an array of neighborhood keys."""
+    keys = np.asarray(keys, dtype=np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    out = np.empty(len(unique), dtype=np.int64)
+    entries = self.entries
+    missing = []
+    for i, key in enumerate(unique.tolist()):
+      mask = entries.get(key)
+      if mask is None:
+        missing.append(i)
+      else:
+        entries.move_to_end(key)
+        out[i] = mask
+    # modules sharing a pattern that was just evaluated count as hits
+    self.hits += len(keys) - len(missing)
+    self.misses += len(missing)
+
+    if missing:
+      out[missing] = legal_pivots(unique[missing])
+      for i in missing:
+        entries[int(unique[i])] = int(out[i])
+      while len(entries) > self.maxsize:
+        entries.popitem(last=False)
+    return out[inverse.reshape(-1)]
+
+
+# neighborhood patterns do not depend on the map, so every map shares one cache
+PIVOT_CACHE = PivotCache()
@@ -0,0 +1,73 @@
+import numpy as np
+from ogm.canonical import ROTATIONS
+
+X, Y, Z = np.eye(3, dtype=int)
+
+# Base pivots in a reference frame where the module moves along +x and is
+# supported by a neighbor at -y. Each is (cells that must be occupied, cells
+# that must be empty, destination), offsets relative to the moving module.
+BASE_PIVOTS = {
+  # slide along the neighbor and the cell next to it
+  "slide": ([(0, 0, 0), (0, -1, 0), (1, -1, 0)],
+            [(1, 0, 0), (0, 1, 0), (1, 1, 0)],
+            (1, 0, 0)),
+  # roll over the edge of a single neighbor onto its far side
+  "corner": ([(0, 0, 0), (0, -1, 0)],
+             [(0, 1, 0), (1, -1, 0), (1, 0, 0), (1, 1, 0), (2, -1, 0), (2, 0, 0), (2, 1, 0)],
+             (1, -1, 0)),
+}
+REFERENCE_FRAME = (X, -Y)
+
+# (move direction, support direction) of actions 2k+1 and 2k+2, the first a
+# slide and the second a corner pivot; fixes the action numbering
+PIVOT_FRAMES = [
+  (X, -Y), (X, Y), (Y, X), (-Y, X), (-X, -Y), (-X, Y), (Y, -X), (-Y, -X),
+  (X, -Z), (X, Z), (Z, X), (-Z, X), (-X, -Z), (-X, Z), (Z, -X), (-Z, -X),
+  (Y, -Z), (Y, Z), (Z, Y), (-Z, Y), (-Y, -Z), (-Y, Z), (Z, -Y), (-Z, -Y),
+]
+PIVOT_KINDS = ("slide", "corner")
+
+WINDOW_SIZE = 9
+
+
+def frame_rotation(move, support):
+  """The rotation taking the reference frame onto (move, support)."""
+  for r in ROTATIONS:
+    if np.array_equal(r @ REFERENCE_FRAME[0], move) and np.array_equal(r @ REFERENCE_FRAME[1], support):
+      return r
+  raise ValueError(f"No rotation maps the reference frame onto {move}, {support}")
+
+
+def compile_pivot_table():
+  """Rotate the base pivots into all 48 actions.
+
+  Returns:
+      offsets: (48, 9, 3) window cells of every action, padded
+      expected: (48, 9) whether each window cell must be occupied
+      valid: (48, 9) False on padding
+      destinations: (48, 3) where the module ends up
+  """
+  offsets = np.zeros((48, WINDOW_SIZE, 3), dtype=int)
+  expected = np.zeros((48, WINDOW_SIZE), dtype=bool)
+  valid = np.zeros((48, WINDOW_SIZE), dtype=bool)
+  destinations = np.zeros((48, 3), dtype=int)
+
+  for k, (move, support) in enumerate(PIVOT_FRAMES):
+    r = frame_rotation(move, support)
+    for j, kind in enumerate(PIVOT_KINDS):
+      p = 2 * k + j
+      occupied, empty, destination = BASE_PIVOTS[kind]
+      cells = np.array(occupied + empty) @ r.T
+      offsets[p, :len(cells)] = cells
+      expected[p, :len(occupied)] = True
+      valid[p, :len(cells)] = True
+      destinations[p] = r @ destination
+
+  for table in (offsets, expected, valid, destinations):
+    table.setflags(write=False)
+  return offsets, expected, valid, destinations
+
+
+# built once per process and shared by every map
+PIVOT_OFFSETS, PIVOT_EXPECTED, PIVOT_VALID, PIVOT_DESTINATIONS = compile_pivot_table()
+PIVOT_STEPS = [tuple(int(c) for c in d) for d in PIVOT_DESTINATIONS]
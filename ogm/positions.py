@@ -0,0 +1,62 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# coordinates of the sparse store reach +-2^20, so int16 is too small for positions
+POSITION_DTYPE = np.int32
+
+
+def to_position_array(module_positions, n):
+  """(n, 3) array of a module -> position mapping, row m-1 for module m."""
+  if isinstance(module_positions, PositionView):
+    return module_positions.array.astype(POSITION_DTYPE)
+  return np.array([module_positions[m] for m in range(1, n + 1)], dtype=POSITION_DTYPE).reshape(n, 3)
+
+
+def position_items(module_positions):
+  """Module numbers and (k, 3) positions of a module -> position mapping."""
+  if isinstance(module_positions, PositionView):
+    return np.arange(1, len(module_positions) + 1), module_positions.array
+  modules = np.fromiter(module_positions.keys(), dtype=int, count=len(module_positions))
+  return modules, np.array(list(module_positions.values()), dtype=POSITION_DTYPE).reshape(-1, 3)
+
+
+class PositionView(MutableMapping):
+  """Dict-style view of an (n, 3) position array, module m at row m-1.
+
+  Reads return tuples of ints and writes go straight to the array, so code
+  written against the old dict-of-tuples positions keeps working while the
+  map itself works on the array as a whole.
+  """
+
+  def __init__(self, array):
+    self.array = array
+
+  def _row(self, module):
+    if not 1 <= module <= len(self.array):
+      raise KeyError(module)
+    return module - 1
+
+  def __getitem__(self, module):
+    return tuple(self.array[self._row(module)].tolist())
+
+  def __setitem__(self, module, pos):
+    self.array[self._row(module)] = pos
+
+  def __delitem__(self, module):
+    raise TypeError("Modules cannot be removed from a position array")
+
+  def __iter__(self):
+    return iter(range(1, len(self.array) + 1))
+
+  def __len__(self):
+    return len(self.array)
+
+  def __contains__(self, module):
+    return isinstance(module, (int, np.integer)) and 1 <= module <= len(self.array)
+
+  def copy(self):
+    return dict(self.items())
+
+  def __repr__(self):
+    return repr(self.copy())
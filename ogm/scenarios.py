@@ -0,0 +1,168 @@
+import json
+
+import numpy as np
+from ogm.occupancy_grid_map import OccupancyGridMap
+
+FACE_STEPS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+
+SHAPES = ("line", "slab", "blob", "tree")
+
+
+def random_polycube(n, shape="blob", rng=None):
+  """Grow a random connected configuration of n modules.
+
+  Args:
+      n: Number of modules
+      shape: "line" for a straight bar along a random axis, "slab" for a blob
+          confined to one axis-aligned plane, "blob" for a compact 3D blob,
+          "tree" for a polycube whose adjacency graph has no cycles
+      rng: numpy Generator, a fresh unseeded one if omitted
+
+  Returns:
+      Dictionary mapping module numbers 1..n to (x,y,z) positions, labels are
+      shuffled so module 1 is not always the seed cell
+  """
+  if n <= 0:
+    raise ValueError("Number of modules must be positive")
+  if shape not in SHAPES:
+    raise ValueError(f"Unknown shape '{shape}', expected one of {list(SHAPES)}")
+  rng = np.random.default_rng() if rng is None else rng
+
+  if shape == "line":
+    axis = np.zeros(3, dtype=int)
+    axis[rng.integers(3)] = 1
+    cells = [tuple(int(c) for c in i * axis) for i in range(n)]
+  else:
+    steps = FACE_STEPS
+    if shape == "slab":
+      normal = rng.integers(3)
+      steps = [s for s in FACE_STEPS if s[normal] == 0]
+    # Eden growth, each step occupies a uniformly random empty cell on the boundary
+    cells = []
+    occupied = set()
+    touching = {}
+    frontier = [(0, 0, 0)]
+    queued = {(0, 0, 0)}
+    while len(cells) < n:
+      i = rng.integers(len(frontier))
+      cell = frontier[i]
+      frontier[i] = frontier[-1]
+      frontier.pop()
+      queued.discard(cell)
+      # a tree only grows cells touching a single module, a cell touching two never qualifies again
+      if shape == "tree" and touching.get(cell, 0) > 1:
+        continue
+      occupied.add(cell)
+      cells.append(cell)
+      for step in steps:
+        nb = (cell[0] + step[0], cell[1] + step[1], cell[2] + step[2])
+        touching[nb] = touching.get(nb, 0) + 1
+        if nb not in occupied and nb not in queued:
+          queued.add(nb)
+          frontier.append(nb)
+
+  order = rng.permutation(n)
+  return {m + 1: cells[i] for m, i in enumerate(order)}
+
+
+class Scenario:
+  """A start and goal configuration pair with the seed and shape that produced it."""
+
+  def __init__(self, start, goal, shape=None, seed=None):
+    if sorted(start) != sorted(goal):
+      raise ValueError("Start and goal configurations must hold the same modules")
+    self.start = start
+    self.goal = goal
+    self.shape = shape
+    self.seed = seed
+
+  @property
+  def n(self):
+    return len(self.start)
+
+  def to_ogm(self, backend="dense"):
+    return OccupancyGridMap(self.start, self.goal, self.n, backend=backend)
+
+  def __repr__(self):
+    return f"Scenario(n={self.n}, shape={self.shape!r}, seed={self.seed})"
+
+
+def random_scenario(n, shape="blob", seed=None):
+  """Random start and goal of the same shape, reproducible from seed."""
+  rng = np.random.default_rng(seed)
+  start = random_polycube(n, shape, rng)
+  goal = random_polycube(n, shape, rng)
+  return Scenario(start, goal, shape, seed)
+
+
+def generate_scenarios(count, n, shape="blob", seed=None):
+  """Generate count scenarios, each reproducible on its own via random_scenario(n, shape, s.seed).
+
+  Args:
+      count: Number of scenarios
+      n: Module count, an int or a sequence of count ints
+      shape: A shape name or a sequence of count shape names
+      seed: Seed of the whole batch
+  """
+  sizes = [n] * count if np.isscalar(n) else list(n)
+  shapes = [shape] * count if isinstance(shape, str) else list(shape)
+  if len(sizes) != count or len(shapes) != count:
+    raise ValueError("Per-scenario sizes and shapes must have count entries")
+  seeds = np.random.SeedSequence(seed).generate_state(count)
+  return [random_scenario(int(k), s, int(sd)) for k, s, sd in zip(sizes, shapes, seeds)]
+
+
+def _to_array(positions):
+  return np.array([positions[m] for m in sorted(positions)], dtype=np.int32).reshape(-1, 3)
+
+
+def _to_dict(array):
+  return {m + 1: tuple(int(c) for c in p) for m, p in enumerate(array)}
+
+
+def save_scenarios(path, scenarios):
+  """Write scenarios to path, as .npz arrays or, for .jsonl, one JSON object per line.
+
+  The npz layout packs all scenarios into flat int32 (sum n, 3) start and goal
+  arrays, row m-1 of a scenario holding module m, with per-scenario sizes,
+  seeds (-1 if unknown) and shapes alongside.
+  """
+  path = str(path)
+  if path.endswith(".jsonl"):
+    with open(path, "w") as f:
+      for s in scenarios:
+        f.write(json.dumps({"n": s.n, "shape": s.shape, "seed": s.seed,
+                            "start": _to_array(s.start).tolist(),
+                            "goal": _to_array(s.goal).tolist()}) + "\n")
+  elif path.endswith(".npz"):
+    np.savez_compressed(
+      path,
+      sizes=np.array([s.n for s in scenarios], dtype=np.int64),
+      seeds=np.array([-1 if s.seed is None else s.seed for s in scenarios], dtype=np.int64),
+      shapes=np.array([s.shape or "" for s in scenarios]),
+      start=np.concatenate([_to_array(s.start) for s in scenarios]) if scenarios else np.zeros((0, 3), np.int32),
+      goal=np.concatenate([_to_array(s.goal) for s in scenarios]) if scenarios else np.zeros((0, 3), np.int32))
+  else:
+    raise ValueError(f"Unknown scenario format for '{path}', expected .npz or .jsonl")
+
+
+def load_scenarios(path):
+  """Read scenarios written by save_scenarios."""
+  path = str(path)
+  if path.endswith(".jsonl"):
+    scenarios = []
+    with open(path) as f:
+      for line in f:
+        if line.strip():
+          record = json.loads(line)
+          scenarios.append(Scenario(_to_dict(record["start"]), _to_dict(record["goal"]),
+                                    record.get("shape"), record.get("seed")))
+    return scenarios
+  if path.endswith(".npz"):
+    with np.load(path) as data:
+      bounds = np.concatenate([[0], np.cumsum(data["sizes"])])
+      start, goal = data["start"], data["goal"]
+      return [Scenario(_to_dict(start[a:b]), _to_dict(goal[a:b]), str(shape) or None,
+                       None if seed < 0 else int(seed))
+              for a, b, shape, seed in zip(bounds[:-1], bounds[1:], data["shapes"], data["seeds"])]
+  raise ValueError(f"Unknown scenario format for '{path}', expected .npz or .jsonl")
@@ -0,0 +1,111 @@
+import numpy as np
+from ogm.connectivity import CSRGraph
+from ogm.pivots import PIVOT_DESTINATIONS, PIVOT_EXPECTED, PIVOT_OFFSETS, PIVOT_VALID
+
+
+def _cells(pos, offsets):
+  return {tuple(c) for c in (np.asarray(pos) + offsets).tolist()}
+
+
+class ParallelScheduler:
+  """Pack a sequential pivot plan into rounds of simultaneous moves.
+
+  Moves are taken in plan order and appended to the current round while they
+  cannot interfere with it, otherwise the round is closed and a new one
+  started, so the plan order between rounds is kept and the final
+  configuration is that of the sequential plan. A move's footprint is its own
+  cell plus every cell its pivot sweeps (the cells its window needs empty,
+  destination included). Two moves may share a round when neither window
+  touches the other's footprint, so footprints are disjoint and no move
+  loses a support or gains an obstacle from another. The modules of a round
+  are in flight together, so the configuration without all of them must
+  stay connected; each lands next to a support that stays in place, so the
+  configuration after the round is connected as well.
+
+  The plan must be legal when executed sequentially. Feed moves with add()
+  (online, e.g. after every take_action of an agent) or all at once with
+  schedule_moves, and call finish() to close the last round.
+  """
+
+  def __init__(self, positions):
+    """
+    Args:
+        positions: (n, 3) start positions, row m-1 for module m (e.g. ogm.get_state())
+    """
+    self.positions = np.array(positions, dtype=np.int64).reshape(-1, 3)
+    self.rounds = []
+    self.moves = 0
+    self._round = []
+    self._moving = []
+    self._windows = set()
+    self._footprints = set()
+
+  def _connected_without(self, modules):
+    keep = np.ones(len(self.positions), dtype=bool)
+    keep[np.asarray(modules) - 1] = False
+    return CSRGraph.from_positions(self.positions[keep]).is_connected()
+
+  def add(self, module, action):
+    """Schedule the next move of the plan and return the round it runs in (0-based)."""
+    # positions are those at the start of the round, so a module moves at most once per round
+    if module in self._moving:
+      self._close()
+
+    pos = self.positions[module - 1]
+    valid = PIVOT_VALID[action - 1]
+    window = _cells(pos, PIVOT_OFFSETS[action - 1][valid])
+    footprint = _cells(pos, PIVOT_OFFSETS[action - 1][valid & ~PIVOT_EXPECTED[action - 1]]) | {tuple(pos.tolist())}
+
+    if self._round and (window & self._footprints or footprint & self._windows
+                        or not self._connected_without(self._moving + [module])):
+      self._close()
+
+    self._round.append((module, action))
+    self._moving.append(module)
+    self._windows |= window
+    self._footprints |= footprint
+    self.moves += 1
+    return len(self.rounds)
+
+  def _close(self):
+    for module, action in self._round:
+      self.positions[module - 1] += PIVOT_DESTINATIONS[action - 1]
+    self.rounds.append(self._round)
+    self._round = []
+    self._moving = []
+    self._windows = set()
+    self._footprints = set()
+
+  def finish(self):
+    """Close the open round and return the list of rounds."""
+    if self._round:
+      self._close()
+    return self.rounds
+
+  @property
+  def makespan(self):
+    """Number of rounds, the open one included."""
+    return len(self.rounds) + bool(self._round)
+
+  @property
+  def parallelism(self):
+    """Average moves per round, 1.0 for a plan that could not be packed at all."""
+    return self.moves / self.makespan if self.makespan else 0.0
+
+  def summary(self):
+    sizes = [len(r) for r in self.rounds] + ([len(self._round)] if self._round else [])
+    widest = max(sizes, default=0)
+    return f"{self.moves} moves in {self.makespan} rounds, parallelism {self.parallelism:.2f} (widest round {widest})"
+
+
+def schedule_moves(ogm, moves):
+  """Pack a sequential plan starting from the current configuration of ogm.
+
+  Returns:
+      The finished ParallelScheduler, see rounds, makespan and parallelism
+  """
+  scheduler = ParallelScheduler(ogm.get_state())
+  for module, action in moves:
+    scheduler.add(module, action)
+  scheduler.finish()
+  return scheduler
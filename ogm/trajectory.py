@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy as np
+from ogm.pivots import PIVOT_DESTINATIONS
+
+META_FILE = "meta.json"
+MOVES_FILE = "moves.bin"
+KEYFRAMES_FILE = "keyframes.bin"
+KEYFRAME_STEPS_FILE = "keyframe_steps.bin"
+# module number of the move row that stands for a set_state jump
+RESET = 0
+
+
+def _log_dtype(n, grid_size):
+  return np.int16 if max(n, grid_size) < np.iinfo(np.int16).max else np.int32
+
+
+class TrajectoryRecorder:
+  """Stream the moves of a map to disk as they are taken.
+
+  A log is a directory holding meta.json, moves.bin with one (module, action)
+  row per step and keyframes.bin with the anchored positions (get_state) of
+  every keyframe_interval-th step, both raw int16 arrays (int32 once module
+  numbers or coordinates no longer fit), and keyframe_steps.bin with the
+  int64 step of each keyframe. Moves are buffered in a fixed-size array, so
+  memory stays bounded however long the search runs. Attach it with
+
+      ogm.recorder = TrajectoryRecorder("run.traj", ogm)
+
+  and every take_action is logged. A set_state jump is logged as a step of
+  its own, a (RESET, 0) row followed by a keyframe of the new configuration.
+  """
+
+  def __init__(self, path, ogm, keyframe_interval=1000, buffer_size=4096):
+    if keyframe_interval <= 0:
+      raise ValueError("keyframe_interval must be positive")
+    self.path = str(path)
+    self.ogm = ogm
+    self.keyframe_interval = keyframe_interval
+    self.dtype = _log_dtype(len(ogm.modules), ogm.grid_shape[0])
+    self.steps = 0
+
+    os.makedirs(self.path, exist_ok=True)
+    with open(os.path.join(self.path, META_FILE), "w") as f:
+      json.dump({"n": len(ogm.modules), "keyframe_interval": keyframe_interval,
+                 "dtype": np.dtype(self.dtype).name, "anchor": [int(c) for c in ogm.recenter_to]}, f)
+    self._moves = open(os.path.join(self.path, MOVES_FILE), "wb")
+    self._keyframes = open(os.path.join(self.path, KEYFRAMES_FILE), "wb")
+    self._keyframe_steps = open(os.path.join(self.path, KEYFRAME_STEPS_FILE), "wb")
+    self._buffer = np.empty((buffer_size, 2), dtype=self.dtype)
+    self._buffered = 0
+    self._write_keyframe()
+
+  def _write_keyframe(self):
+    self._keyframes.write(self.ogm.get_state().astype(self.dtype).tobytes())
+    self._keyframe_steps.write(np.int64(self.steps).tobytes())
+
+  def _append(self, module, action):
+    self._buffer[self._buffered] = (module, action)
+    self._buffered += 1
+    self.steps += 1
+    if self._buffered == len(self._buffer):
+      self.flush()
+
+  def record(self, module, action):
+    """Log a move the map has just applied."""
+    self._append(module, action)
+    if self.steps % self.keyframe_interval == 0:
+      self._write_keyframe()
+
+  def reset(self):
+    """Log a jump to the map's current configuration, which replay cannot derive from the moves."""
+    self._append(RESET, 0)
+    self._write_keyframe()
+
+  def flush(self):
+    self._moves.write(self._buffer[:self._buffered].tobytes())
+    self._buffered = 0
+    self._moves.flush()
+    self._keyframes.flush()
+    self._keyframe_steps.flush()
+
+  def close(self):
+    if self._moves.closed:
+      return
+    self.flush()
+    self._moves.close()
+    self._keyframes.close()
+    self._keyframe_steps.close()
+    if self.ogm.recorder is self:
+      self.ogm.recorder = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+
+class TrajectoryLog:
+  """Random-access replay of a log written by TrajectoryRecorder.
+
+  Moves and keyframes are memory-mapped. The state after any step is the
+  latest keyframe at or before it plus the summed pivot offsets of the moves
+  since, so a lookup costs O(keyframe_interval) vectorized work and no Python
+  loop. Every reset row is followed by a keyframe, so no reset lies in
+  between. Logs that were never closed can be read up to their last flush.
+  """
+
+  def __init__(self, path):
+    self.path = str(path)
+    with open(os.path.join(self.path, META_FILE)) as f:
+      meta = json.load(f)
+    self.n = meta["n"]
+    self.keyframe_interval = meta["keyframe_interval"]
+    self.anchor = np.array(meta["anchor"])
+    dtype = np.dtype(meta["dtype"])
+    self.moves = self._map(MOVES_FILE, dtype, (2,))
+    self.keyframes = self._map(KEYFRAMES_FILE, dtype, (self.n, 3))
+    if os.path.exists(os.path.join(self.path, KEYFRAME_STEPS_FILE)):
+      steps = self._map(KEYFRAME_STEPS_FILE, np.dtype(np.int64), ())
+      # the two files may have been flushed a keyframe apart
+      self.keyframes = self.keyframes[:len(steps)]
+      self.keyframe_steps = steps[:len(self.keyframes)]
+    else:
+      # logs written before resets were recorded only hold the periodic keyframes
+      self.keyframe_steps = np.arange(len(self.keyframes)) * self.keyframe_interval
+
+  def _map(self, name, dtype, row_shape):
+    path = os.path.join(self.path, name)
+    rows = os.path.getsize(path) // (dtype.itemsize * int(np.prod(row_shape)))
+    if rows == 0:
+      return np.zeros((0,) + row_shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,) + row_shape)
+
+  def __len__(self):
+    """Number of logged steps."""
+    return len(self.moves)
+
+  def state_at(self, step):
+    """Anchored (n, 3) positions after step moves, as get_state() returned them."""
+    if not 0 <= step <= len(self):
+      raise IndexError(f"Step {step} outside the logged 0..{len(self)}")
+    k = np.searchsorted(self.keyframe_steps, step, side="right") - 1
+    positions = self.keyframes[k].astype(int)
+    moves = self.moves[self.keyframe_steps[k]:step].astype(int)
+    np.add.at(positions, moves[:, 0] - 1, PIVOT_DESTINATIONS[moves[:, 1] - 1])
+    return positions - positions[0] + self.anchor
+
+  def replay(self, ogm, step):
+    """Put ogm into the state after step moves."""
+    ogm.set_state(self.state_at(step))
+
+  def states(self, start=0, stop=None, stride=1):
+    """Yield the anchored positions of every stride-th step from start up to stop (inclusive)."""
+    stop = len(self) if stop is None else stop
+    positions = self.state_at(start)
+    for step in range(start, stop + 1, stride):
+      if step > start:
+        moves = self.moves[step - stride:step].astype(int)
+        if (moves[:, 0] == RESET).any():
+          positions = self.state_at(step)
+        else:
+          positions = positions.copy()
+          np.add.at(positions, moves[:, 0] - 1, PIVOT_DESTINATIONS[moves[:, 1] - 1])
+          positions -= positions[0] - self.anchor
+      yield positions
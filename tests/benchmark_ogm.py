@@ -0,0 +1,188 @@
+"""Time the OccupancyGridMap hot paths across module counts and backends.
+
+    python tests/benchmark_ogm.py
+    python tests/benchmark_ogm.py --sizes 3 10 50 --backends sparse --output sparse.json
+
+Every (backend, n) case builds a seeded random scenario (see ogm.scenarios),
+then times __init__ (which includes rotation_matrices), calc_possible_actions,
+take_action, check_final and a RandomSearchAgent run. Timings are taken without
+tracemalloc, peak memory is measured in a second pass over construction and a
+few steps. For every n, --batch-size random walks are also stepped at once by a
+BatchedOccupancyGridMap and one by one by a loop over sparse maps, both
+reported in environment steps per second. Results are written as JSON records,
+one per (backend, n, stage).
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from agent.random_search_agent import RandomSearchAgent
+from ogm.batched_occupancy_grid_map import BatchedOccupancyGridMap
+from ogm.occupancy import grid_dtype
+from ogm.occupancy_grid_map import FRAMES, OccupancyGridMap
+from ogm.scenarios import SHAPES, random_scenario
+
+
+def grid_bytes(backend, n):
+    """Memory of the three occupancy stores of a map whose store is sized by the grid, 0 for sparse."""
+    grid_size = OccupancyGridMap.calculate_grid_size(n)
+    cells = grid_size ** 3
+    if backend == "dense":
+        return 3 * cells * np.dtype(grid_dtype((grid_size,) * 3)).itemsize
+    if backend == "bitboard":
+        # one bit per cell
+        return 3 * cells / 8
+    return 0
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def record(backend, n, stage, times, **extra):
+    return dict(backend=backend, n=n, stage=stage, calls=len(times),
+                mean_s=float(np.mean(times)), min_s=float(np.min(times)), **extra)
+
+
+def random_walk_steps(ogm, steps, rng):
+    """Time calc_possible_actions/take_action/check_final along a random walk."""
+    possible, take, final = [], [], []
+    for _ in range(steps):
+        t0 = time.perf_counter()
+        ogm.calc_possible_actions()
+        possible.append(time.perf_counter() - t0)
+
+        modules, actions = np.nonzero(ogm.possible_actions_mask)
+        i = rng.integers(len(modules))
+        t0 = time.perf_counter()
+        ogm.take_action(int(modules[i]) + 1, int(actions[i]) + 1)
+        take.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        ogm.check_final()
+        final.append(time.perf_counter() - t0)
+    return possible, take, final
+
+
+def run_case(backend, n, args):
+    rng = np.random.default_rng(args.seed + n)
+    scenario = random_scenario(n, args.shape, args.seed + n)
+    start, goal = scenario.start, scenario.goal
+    results = []
+
+    init = timed(lambda: OccupancyGridMap(start, goal, n, backend=backend, frame=args.frame), args.repeats)
+    results.append(record(backend, n, "init", init))
+
+    ogm = OccupancyGridMap(start, goal, n, backend=backend, frame=args.frame)
+    possible, take, final = random_walk_steps(ogm, args.steps, rng)
+    results.append(record(backend, n, "calc_possible_actions", possible))
+    results.append(record(backend, n, "take_action", take))
+    results.append(record(backend, n, "check_final", final))
+
+    ogm = OccupancyGridMap(start, goal, n, backend=backend, frame=args.frame)
+    agent = RandomSearchAgent(max_steps=args.search_steps, seed=args.seed)
+    t0 = time.perf_counter()
+    agent.search(ogm)
+    elapsed = time.perf_counter() - t0
+    results.append(record(backend, n, "search", [elapsed], steps=agent.steps_taken,
+                          steps_per_second=agent.steps_taken / elapsed, stage_stats=agent.stats.as_dict()))
+
+    # memory pass, kept apart so tracemalloc does not skew the timings
+    tracemalloc.start()
+    ogm = OccupancyGridMap(start, goal, n, backend=backend, frame=args.frame)
+    init_peak = tracemalloc.get_traced_memory()[1]
+    random_walk_steps(ogm, min(args.steps, 5), rng)
+    step_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    for r in results:
+        r["peak_bytes"] = step_peak
+    results[0]["peak_bytes"] = init_peak
+    return results
+
+
+def run_batched_case(n, args):
+    """Step args.batch_size random walks for args.steps steps, batched and in a loop over sparse maps."""
+    rng = np.random.default_rng(args.seed + n)
+    scenarios = [random_scenario(n, args.shape, args.seed + n + b) for b in range(args.batch_size)]
+
+    env = BatchedOccupancyGridMap([s.start for s in scenarios], [s.goal for s in scenarios], n, args.batch_size)
+    for _ in range(args.steps):
+        legal = env.legal_actions().reshape(args.batch_size, -1)
+        # a uniformly random legal move per environment
+        choice = np.argmax(legal * rng.random(legal.shape), axis=1)
+        env.step(choice // 48 + 1, np.where(legal.any(axis=1), choice % 48 + 1, 0))
+    batched = record("batched", n, "batched_step", [env.step_time], batch_size=args.batch_size,
+                     steps=env.env_steps, steps_per_second=env.steps_per_second, grid_bytes=env.grid.nbytes)
+
+    maps = [OccupancyGridMap(s.start, s.goal, n, backend="sparse", frame="relative") for s in scenarios]
+    elapsed, steps = 0.0, 0
+    for _ in range(args.steps):
+        for ogm in maps:
+            t0 = time.perf_counter()
+            modules, actions = np.nonzero(ogm.legal_actions())
+            elapsed += time.perf_counter() - t0
+            if len(modules) == 0:
+                continue
+            i = rng.integers(len(modules))
+            t0 = time.perf_counter()
+            ogm.take_action(int(modules[i]) + 1, int(actions[i]) + 1)
+            elapsed += time.perf_counter() - t0
+            steps += 1
+    scalar = record("sparse", n, "scalar_loop", [elapsed], batch_size=args.batch_size,
+                    steps=steps, steps_per_second=steps / elapsed if elapsed > 0 else 0.0)
+    return [batched, scalar]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 10, 50, 200, 1000])
+    parser.add_argument("--backends", nargs="+", default=["dense", "sparse", "bitboard"])
+    parser.add_argument("--repeats", type=int, default=3, help="constructions timed per case")
+    parser.add_argument("--steps", type=int, default=20, help="random walk steps timed per case")
+    parser.add_argument("--search-steps", type=int, default=50, help="max_steps of the RandomSearchAgent run")
+    parser.add_argument("--batch-size", type=int, default=64,
+                        help="random walks of the batched and scalar loop cases, 0 skips them")
+    parser.add_argument("--max-dense-bytes", type=float, default=1e9,
+                        help="skip dense and bitboard cases whose grids would need more memory than this")
+    parser.add_argument("--frame", choices=FRAMES, default="fixed", help="coordinate frame of the maps")
+    parser.add_argument("--shape", choices=SHAPES, default="blob", help="shape of the random configurations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        for n in args.sizes:
+            if grid_bytes(backend, n) > args.max_dense_bytes:
+                print(f"{backend:>6} n={n:<5} skipped, {backend} grids need {grid_bytes(backend, n) / 1e9:.1f} GB")
+                results.append(dict(backend=backend, n=n, stage="skipped", reason=f"{backend} grid too large"))
+                continue
+            for r in run_case(backend, n, args):
+                print(f"{backend:>6} n={n:<5} {r['stage']:<22} {1e3 * r['mean_s']:>10.3f} ms "
+                      f"(min {1e3 * r['min_s']:.3f}, {r['calls']} calls) peak {r['peak_bytes'] / 1e6:.1f} MB")
+                results.append(r)
+    if args.batch_size > 0:
+        for n in args.sizes:
+            for r in run_batched_case(n, args):
+                print(f"{r['backend']:>7} n={n:<5} {r['stage']:<14} {r['steps_per_second']:>10.0f} env-steps/s "
+                      f"({r['steps']} steps of {args.batch_size} environments)")
+                results.append(r)
+
+    meta = dict(python=platform.python_version(), numpy=np.__version__, machine=platform.machine(),
+                args=vars(args), timestamp=time.time())
+    with open(args.output, "w") as f:
+        json.dump(dict(meta=meta, results=results), f, indent=1)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+from agent.astar_agent import AStarAgent, TreeCursor
+from ogm.canonical import canonical_key
+from agent.heuristics import goal_rotations, misplaced_modules
+
+class TestAStarAgent(unittest.TestCase):
+
+    module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4), 4: (5, 5, 5), 5: (5, 4, 5)}
+    final_module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (4, 6, 4), 4: (4, 7, 4), 5: (3, 7, 4)}
+
+    def solve(self, heuristic, mode="forward"):
+        ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.final_module_positions, 5)
+        agent = AStarAgent(heuristic=heuristic, max_nodes=20000, mode=mode)
+        self.assertTrue(agent.search(ogm))
+        self.assertTrue(ogm.check_final())
+        self.assertEqual(agent.steps_taken, len(agent.plan))
+        return agent
+
+    def test_plan_is_optimal(self):
+        # uniform-cost search gives the optimal length, an admissible heuristic must match it
+        blind = self.solve("zero")
+        informed = self.solve("combined")
+        self.assertEqual(len(informed.plan), len(blind.plan))
+        self.assertLessEqual(informed.nodes_expanded, blind.nodes_expanded)
+
+    def test_bidirectional_matches_forward(self):
+        # the goal side meets the start side and its half is replayed in the forward frame
+        forward = self.solve("combined")
+        bidirectional = self.solve("combined", mode="bidirectional")
+        self.assertEqual(len(bidirectional.plan), len(forward.plan))
+
+    def test_node_budget(self):
+        ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.final_module_positions, 5)
+        agent = AStarAgent(heuristic="zero", max_nodes=1)
+        self.assertFalse(agent.search(ogm))
+        self.assertIsNone(agent.plan)
+        self.assertEqual(agent.nodes_expanded, 1)
+
+    def test_misplaced_modules_matches_brute_force(self):
+        rng = np.random.RandomState(0)
+        for _ in range(50):
+            n = rng.randint(1, 12)
+            goals = goal_rotations(rng.randint(-3, 4, (n, 3)))
+            positions = goals[rng.randint(24)] + rng.randint(-5, 6, 3)
+            positions[rng.random_sample(n) < 0.5] += rng.randint(-2, 3, 3)
+            expected = min(n - max(sum((d == t).all(axis=1)) for t in d) for d in positions[None] - goals)
+            self.assertEqual(misplaced_modules(positions, goals), expected)
+
+    def test_tree_cursor_reaches_every_node(self):
+        # walking with apply/revert and jumping with set_state land on the stored configuration
+        agent = AStarAgent()
+        for max_walk in (0, 1, 100):
+            ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.final_module_positions, 5)
+            start = ogm.get_state()
+            table = {canonical_key(start): (0, start, None, None)}
+            cursor = TreeCursor(ogm, canonical_key(start), max_walk=max_walk)
+            rng = np.random.RandomState(max_walk)
+            for _ in range(40):
+                key = list(table)[rng.randint(len(table))]
+                cursor.goto(table, key)
+                self.assertEqual(ogm.state_key(), key)
+                m, p = (int(i) + 1 for i in np.argwhere(ogm.legal_actions())[rng.randint(ogm.legal_actions().sum())])
+                child = agent.successor(ogm, table[key][1], m, p)
+                table.setdefault(canonical_key(child), (table[key][0] + 1, child, key, (m, p)))
+
+if __name__ == "__main__":
+    unittest.main()
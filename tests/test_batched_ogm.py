@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+from ogm.batched_occupancy_grid_map import BatchedOccupancyGridMap
+from ogm.connectivity import CSRGraph
+from ogm.scenarios import SHAPES, random_scenario
+
+class TestBatchedOGM(unittest.TestCase):
+
+    three_modules = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4)}
+    starts = [{1: (4, 4, 4), 2: (4, 5, 4), 3: (4, 6, 4), 4: (5, 6, 4)},
+              {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4), 4: (5, 5, 5)},
+              {1: (4, 4, 4), 2: (5, 4, 4), 3: (6, 4, 4), 4: (6, 4, 3)}]
+
+    def test_legal_actions_and_step_match_single_map(self):
+        starts = self.starts
+        goals = [{1: (0, 0, 0), 2: (0, 1, 0), 3: (0, 2, 0), 4: (0, 3, 0)}] * len(starts)
+        env = BatchedOccupancyGridMap(starts, goals, 4, len(starts))
+        singles = [occupancy_grid_map.OccupancyGridMap(s, g, 4) for s, g in zip(starts, goals)]
+        rng = np.random.default_rng(0)
+
+        for _ in range(10):
+            legal = env.legal_actions()
+            modules, actions = [], []
+            for b, ogm in enumerate(singles):
+                pa = ogm.calc_possible_actions()
+                expected = np.array([pa[m] for m in ogm.modules])
+                np.testing.assert_array_equal(legal[b], expected)
+                np.testing.assert_array_equal(env.positions[b], ogm.get_state())
+
+                m, p = np.nonzero(expected)
+                i = rng.integers(len(m))
+                modules.append(m[i] + 1)
+                actions.append(p[i] + 1)
+                ogm.take_action(m[i] + 1, p[i] + 1)
+
+            done = env.step(modules, actions)
+            for b in np.nonzero(done)[0]:
+                singles[b] = occupancy_grid_map.OccupancyGridMap(starts[b], goals[b], 4)
+
+    def test_auto_reset_on_goal(self):
+        # one pivot of module 3 around module 2 reaches the goal
+        start = self.three_modules
+        goal = {1: (4, 4, 4), 2: (4, 5, 4), 3: (4, 6, 4)}
+        env = BatchedOccupancyGridMap(start, goal, 3, 2)
+        module, action = None, None
+        for p in np.nonzero(env.legal_actions()[0, 2])[0]:
+            trial = BatchedOccupancyGridMap(start, goal, 3, 1)
+            if trial.step([3], [p + 1])[0]:
+                module, action = 3, p + 1
+        self.assertIsNotNone(action)
+
+        done = env.step([module, 1], [action, 0])
+        np.testing.assert_array_equal(done, [True, False])
+        np.testing.assert_array_equal(env.positions[0], env.start_positions[0])
+        self.assertEqual(env.episodes_completed, 1)
+        self.assertEqual(env.env_steps, 1)
+
+    def test_random_shapes_match_tarjan(self):
+        n = 30
+        scenarios = [random_scenario(n, shape, seed) for shape in SHAPES for seed in range(2)]
+        env = BatchedOccupancyGridMap([s.start for s in scenarios], [s.goal for s in scenarios], n, len(scenarios))
+        full_grid = occupancy_grid_map.OccupancyGridMap.calculate_grid_size(n) ** 3
+        rng = np.random.default_rng(0)
+        for _ in range(60):
+            aps = env.articulation_mask()
+            for b in range(env.batch_size):
+                graph = CSRGraph.from_positions([tuple(p) for p in env.positions[b]])
+                self.assertEqual(set(np.nonzero(aps[b])[0] + 1), graph.articulation_points())
+            legal = env.legal_actions()
+            modules, actions = np.zeros(env.batch_size, dtype=int), np.zeros(env.batch_size, dtype=int)
+            # a few environments sit out every step and keep their cached masks
+            for b in rng.permutation(env.batch_size)[:-2]:
+                m, p = np.nonzero(legal[b])
+                i = rng.integers(len(m))
+                modules[b], actions[b] = m[i] + 1, p[i] + 1
+            env.step(modules, actions)
+            # every module is on the grid where its position says
+            cells = env.positions - env.origin[:, None]
+            ids = env.grid[env.env_index[:, None], cells[..., 0], cells[..., 1], cells[..., 2]]
+            np.testing.assert_array_equal(ids, np.broadcast_to(np.arange(1, n + 1), ids.shape))
+            self.assertEqual(np.count_nonzero(env.grid), env.batch_size * n)
+        self.assertLess(env.box_side ** 3, full_grid)
+
+    def test_illegal_step_rejected(self):
+        env = BatchedOccupancyGridMap(self.three_modules, self.three_modules, 3, 1)
+        # module 2 is an articulation point
+        with self.assertRaises(ValueError):
+            env.step([2], [1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import networkx as nx
+import numpy as np
+from ogm.connectivity import CSRGraph
+from ogm.occupancy_grid_map import OccupancyGridMap
+from ogm.scenarios import SHAPES, random_polycube, random_scenario
+
+
+def to_networkx(graph):
+    G = nx.Graph()
+    G.add_nodes_from(range(1, graph.n + 1))
+    for i in range(graph.n):
+        for j in graph.indices[graph.indptr[i]:graph.indptr[i + 1]]:
+            G.add_edge(i + 1, int(j) + 1)
+    return G
+
+
+class TestCSRGraph(unittest.TestCase):
+
+    def test_matches_networkx(self):
+        rng = np.random.default_rng(0)
+        for shape in SHAPES:
+            for n in (1, 2, 6, 40):
+                positions = random_polycube(n, shape, rng)
+                graph = CSRGraph.from_positions([positions[m] for m in range(1, n + 1)])
+                G = to_networkx(graph)
+                self.assertEqual(graph.articulation_points(), set(nx.articulation_points(G)))
+                self.assertTrue(graph.is_connected())
+                for m in range(1, n + 1):
+                    H = G.copy()
+                    H.remove_node(m)
+                    self.assertEqual(graph.connected_without(m), len(H) == 0 or nx.is_connected(H))
+
+                edges = [[u - 1, v - 1] for u, v in G.edges]
+                self.assertEqual(CSRGraph.from_edges(n, edges).articulation_points(), graph.articulation_points())
+
+    def test_disconnected_graph(self):
+        # a pair and an isolated module
+        graph = CSRGraph.from_positions([(0, 0, 0), (1, 0, 0), (5, 5, 5)])
+        self.assertFalse(graph.is_connected())
+        self.assertTrue(graph.connected_without(3))
+        self.assertFalse(graph.connected_without(1))
+
+    def test_long_chain_does_not_recurse(self):
+        n = 20000
+        graph = CSRGraph.from_positions([(i, 0, 0) for i in range(n)])
+        mask = graph.articulation_mask()
+        self.assertFalse(mask[0] or mask[-1])
+        self.assertTrue(mask[1:-1].all())
+
+        ogm = OccupancyGridMap({1: (0, 0, 0)}, {1: (0, 0, 0)}, 1)
+        edges = [[i, i + 1] for i in range(n - 1)]
+        self.assertEqual(ogm.articulationPoints(n, edges), list(range(2, n)))
+
+    def test_tracker_connected_without(self):
+        positions = random_polycube(30, "tree", np.random.default_rng(1))
+        ogm = OccupancyGridMap(positions, positions, 30, backend="sparse")
+        aps = ogm.connectivity.full_articulation_points()
+        for m in ogm.modules:
+            self.assertEqual(ogm.connectivity.connected_without(m), m not in aps)
+
+
+def random_walk(ogm, rng, steps):
+    """Take steps random legal moves on ogm."""
+    for _ in range(steps):
+        modules, actions = np.nonzero(ogm.legal_actions())
+        i = rng.integers(len(modules))
+        ogm.take_action(int(modules[i]) + 1, int(actions[i]) + 1)
+
+
+class TestConnectivityTracker(unittest.TestCase):
+
+    def test_matches_tarjan_across_apply_and_revert(self):
+        for shape in SHAPES:
+            # a tiny budget forces deepening, the witness memory and the global fallback
+            for budget in (2, 16):
+                scenario = random_scenario(40, shape, 3)
+                ogm = OccupancyGridMap(scenario.start, scenario.goal, 40, backend="sparse", frame="relative")
+                ogm.connectivity.budget = budget
+                rng = np.random.default_rng(3)
+                tokens = []
+                for _ in range(100):
+                    tracker = ogm.connectivity
+                    self.assertEqual(tracker.articulation_points(), tracker.full_articulation_points())
+                    if tokens and rng.random() < 0.3:
+                        ogm.revert(tokens.pop())
+                        continue
+                    modules, actions = np.nonzero(ogm.legal_actions())
+                    i = rng.integers(len(modules))
+                    tokens.append(ogm.apply(int(modules[i]) + 1, int(actions[i]) + 1))
+
+    def test_blob_and_tree_rarely_run_tarjan(self):
+        steps = 200
+        for shape in ("blob", "tree"):
+            scenario = random_scenario(1000, shape, 0)
+            ogm = OccupancyGridMap(scenario.start, scenario.goal, 1000, backend="sparse", frame="relative")
+            random_walk(ogm, np.random.default_rng(0), steps)
+            self.assertLessEqual(ogm.stats.counts.get("articulation_points.full", 0), steps // 20, shape)
+            tracker = ogm.connectivity
+            self.assertEqual(tracker.articulation_points(), tracker.full_articulation_points())
+
+
+if __name__ == "__main__":
+    unittest.main()
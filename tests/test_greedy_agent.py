@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from agent.greedy_agent import GreedyAgent
+from agent.heuristics import goal_distance, goal_rotations, successor_distances
+from agent.random_search_agent import RandomSearchAgent
+from ogm.occupancy_grid_map import OccupancyGridMap
+from ogm.scenarios import random_scenario
+
+class TestGreedyAgent(unittest.TestCase):
+
+    def test_successor_distances_match_materialised_successors(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            n = int(rng.integers(1, 10))
+            positions = rng.integers(-3, 4, (n, 3))
+            goals = goal_rotations(rng.integers(-3, 4, (n, 3)))
+            modules = rng.integers(0, n, 12)
+            steps = rng.integers(-1, 2, (12, 3))
+            expected = []
+            for m, step in zip(modules, steps):
+                child = positions.copy()
+                child[m] += step
+                expected.append(goal_distance(child, goals))
+            self.assertEqual(successor_distances(positions, goals, modules, steps).tolist(), expected)
+
+    def test_reaches_goal_faster_than_random_search(self):
+        scenario = random_scenario(6, "blob", seed=1)
+        greedy = GreedyAgent(max_steps=500, restarts=3, seed=0)
+        self.assertTrue(greedy.search(scenario.to_ogm()))
+        random = RandomSearchAgent(max_steps=500, seed=0)
+        random.search(scenario.to_ogm())
+        self.assertLess(greedy.steps_taken, random.steps_taken)
+
+        # the trajectory since the last restart replays to the goal
+        ogm = scenario.to_ogm()
+        for module, action in greedy.trajectory:
+            self.assertTrue(ogm.legal_actions()[module - 1, action - 1])
+            ogm.take_action(module, action)
+        self.assertTrue(ogm.check_final())
+
+    def test_seeded_runs_repeat(self):
+        scenario = random_scenario(5, "tree", seed=2)
+        runs = []
+        for _ in range(2):
+            agent = GreedyAgent(max_steps=300, randomness=0.2, seed=7)
+            agent.search(scenario.to_ogm(backend="sparse"))
+            runs.append(agent.trajectory)
+        self.assertEqual(runs[0], runs[1])
+
+    def test_stops_without_legal_moves(self):
+        # a single module can never pivot
+        single = {1: (0, 0, 0)}
+        agent = GreedyAgent(max_steps=50, restarts=2, seed=0)
+        self.assertIsNone(agent.choose(OccupancyGridMap(single, single, 1), {}))
+        self.assertFalse(agent.search(OccupancyGridMap(single, single, 1)))
+        self.assertEqual(agent.steps_taken, 0)
+        self.assertEqual(agent.restarts_used, 2)
+
+if __name__ == "__main__":
+    unittest.main()
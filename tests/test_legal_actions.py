@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from ogm.occupancy_grid_map import OccupancyGridMap
+from ogm.scenarios import random_scenario
+
+class TestLegalActionSet(unittest.TestCase):
+
+    def test_live_mask_matches_full_evaluation(self):
+        rng = np.random.RandomState(0)
+        for backend in ("dense", "sparse", "bitboard"):
+            for frame in ("fixed", "relative"):
+                ogm = random_scenario(12, "tree", 3).to_ogm(backend)
+                ogm.frame = frame
+                live = ogm.legal_actions()
+                tokens = []
+                for step in range(40):
+                    full = ogm.legal_action_mask(ogm.connectivity.articulation_points())
+                    np.testing.assert_array_equal(ogm.legal_actions(), full, err_msg=f"{backend} {frame} {step}")
+                    if step % 4 == 3:
+                        while tokens:
+                            ogm.revert(tokens.pop())
+                    m, p = np.nonzero(ogm.legal_actions())
+                    i = rng.randint(len(m))
+                    if step % 4 == 3:
+                        ogm.take_action(m[i] + 1, p[i] + 1)
+                    else:
+                        tokens.append(ogm.apply(m[i] + 1, p[i] + 1))
+                # the same view is kept and handed out read-only, rebuilds included
+                self.assertIs(ogm.legal_actions(), live)
+                with self.assertRaises(ValueError):
+                    live[0, 0] = True
+
+    def test_update_only_touches_the_neighborhood(self):
+        positions = {m: (m, 0, 0) for m in range(1, 201)}
+        ogm = OccupancyGridMap(positions, positions, 200, backend="sparse", frame="relative")
+        ogm.stats.reset()
+        ogm.take_action(200, int(np.nonzero(ogm.legal_actions()[199])[0][0]) + 1)
+        self.assertLessEqual(ogm.stats.counts["legal_set.modules"], 4)
+        self.assertNotIn("legal_set.rebuild", ogm.stats.counts)
+        # the readme lists pivot checks among the recorded stages
+        self.assertEqual(ogm.stats.counts["pivot_checks"], 1)
+
+    def test_blob_and_tree_updates_do_not_grow_with_n(self):
+        steps = 100
+        for shape in ("blob", "tree"):
+            for n in (250, 2000):
+                scenario = random_scenario(n, shape, 0)
+                ogm = OccupancyGridMap(scenario.start, scenario.goal, n, backend="sparse", frame="relative")
+                ogm.legal_actions()
+                ogm.stats.reset()
+                rng = np.random.RandomState(0)
+                for _ in range(steps):
+                    m, p = np.nonzero(ogm.legal_actions())
+                    i = rng.randint(len(m))
+                    ogm.take_action(m[i] + 1, p[i] + 1)
+                ogm.legal_actions()
+                counts = ogm.stats.counts
+                label = f"{shape} {n}"
+                self.assertLessEqual(counts["legal_set.modules"], 30 * steps, label)
+                self.assertLessEqual(counts["legal_set.refreshed"], 5 * steps, label)
+                self.assertLessEqual(counts.get("articulation_points.full", 0), steps // 20, label)
+                self.assertNotIn("legal_set.rebuild", counts, label)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from agent.mcts_agent import MCTSAgent
+from ogm import occupancy_grid_map
+
+class TestMCTSAgent(unittest.TestCase):
+
+    module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4)}
+    final_module_positions = {1: (4, 4, 4), 2: (3, 5, 4), 3: (4, 5, 4)}
+
+    def make_ogm(self):
+        return occupancy_grid_map.OccupancyGridMap(self.module_positions, self.final_module_positions, 3)
+
+    def test_reaches_goal_and_replays(self):
+        for rollout in ("heuristic", "random"):
+            agent = MCTSAgent(max_steps=30, iterations=60, rollout=rollout, seed=0)
+            self.assertTrue(agent.search(self.make_ogm()))
+            ogm = self.make_ogm()
+            for module, action in agent.trajectory:
+                ogm.take_action(module, action)
+            self.assertTrue(ogm.check_final())
+
+    def test_map_is_unchanged_by_planning(self):
+        ogm = self.make_ogm()
+        agent = MCTSAgent(max_steps=5, iterations=50, seed=1)
+        agent.search(ogm)
+        # planning reverts everything it applies, so only the chosen moves show
+        replay = self.make_ogm()
+        for move in agent.trajectory:
+            replay.take_action(*move)
+        self.assertEqual(ogm.get_state().tolist(), replay.get_state().tolist())
+
+    def test_budgets_and_subtree_reuse(self):
+        agent = MCTSAgent(max_steps=3, iterations=200, max_nodes=15, seed=2)
+        agent.search(occupancy_grid_map.OccupancyGridMap(self.module_positions, {1: (0, 0, 0), 2: (1, 0, 0), 3: (2, 0, 0)}, 3))
+        self.assertLessEqual(agent.node_count, 15)
+        self.assertGreater(agent.reused_visits, 0)
+
+        timed = MCTSAgent(max_steps=1, iterations=10**6, time_limit=0.05, seed=3)
+        timed.search(self.make_ogm())
+        self.assertLess(timed.iterations_run, 10**6)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+
+class TestOGMApplyRevert(unittest.TestCase):
+
+    module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4), 4: (5, 5, 5),
+                        5: (5, 6, 5), 6: (6, 6, 5), 7: (6, 5, 5), 8: (4, 4, 5)}
+
+    def snapshot(self, ogm):
+        tracker = ogm.connectivity
+        cells = np.array([ogm.module_positions[m] for m in ogm.modules])[:, None, :] + np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]])
+        return (dict(ogm.module_positions), ogm.occupancy.lookup(cells).tolist(), ogm.edges,
+                dict(tracker.status), set(tracker.undecided), set(tracker.certain_aps),
+                ogm.connectivity.articulation_points())
+
+    def test_revert_restores_every_cache(self):
+        for backend in ("dense", "sparse", "bitboard"):
+            ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.module_positions, 8, backend=backend)
+            rng = np.random.default_rng(0)
+            snapshots, tokens = [], []
+
+            for _ in range(20):
+                snapshots.append(self.snapshot(ogm))
+                mask = ogm.legal_action_mask(ogm.connectivity.articulation_points())
+                m, p = np.nonzero(mask)
+                i = rng.integers(len(m))
+                tokens.append(ogm.apply(m[i] + 1, p[i] + 1))
+
+            while tokens:
+                ogm.revert(tokens.pop())
+                self.assertEqual(self.snapshot(ogm), snapshots.pop(), msg=f"Backend: {backend}")
+
+    def test_bitboard_snapshots(self):
+        ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.module_positions, 8, backend="bitboard")
+        before = ogm.occupancy.snapshot()
+        # 8 bytes per module, independent of the grid volume
+        self.assertEqual(len(before), 8 * 8)
+        m, p = np.nonzero(ogm.legal_actions())
+        token = ogm.apply(m[0] + 1, p[0] + 1)
+        self.assertNotEqual(ogm.occupancy.snapshot(), before)
+        ogm.revert(token)
+        self.assertEqual(ogm.occupancy.snapshot(), before)
+        self.assertEqual(hash(ogm.occupancy.snapshot()), hash(before))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+from ogm.scenarios import random_scenario
+
+class TestOGMFrame(unittest.TestCase):
+
+    def test_relative_frame_matches_fixed_frame(self):
+        # a 3-module bar wanders far enough for the 9-cell dense grid to need recentering
+        bar = {1: (0, 0, 0), 2: (1, 0, 0), 3: (2, 0, 0)}
+        scenario = random_scenario(6, "tree", seed=4)
+        for backend, start, goal in (("dense", bar, bar), ("sparse", bar, bar),
+                                     ("dense", scenario.start, scenario.goal), ("sparse", scenario.start, scenario.goal)):
+            n = len(start)
+            fixed = occupancy_grid_map.OccupancyGridMap(start, goal, n, backend=backend)
+            relative = occupancy_grid_map.OccupancyGridMap(start, goal, n, backend=backend, frame="relative")
+            rng = np.random.default_rng(0)
+            for _ in range(300):
+                mask = fixed.legal_actions()
+                np.testing.assert_array_equal(mask, relative.legal_actions())
+                np.testing.assert_array_equal(fixed.get_state(), relative.get_state())
+                self.assertEqual(fixed.check_final(), relative.check_final())
+                m, p = np.nonzero(mask)
+                i = rng.integers(len(m))
+                fixed.take_action(int(m[i]) + 1, int(p[i]) + 1)
+                relative.take_action(int(m[i]) + 1, int(p[i]) + 1)
+
+            recenterings = relative.stats.counts.get("recentering", 0)
+            self.assertLess(recenterings, fixed.stats.counts["recentering"])
+            if backend == "sparse":
+                self.assertEqual(recenterings, 0)
+            elif start is bar:
+                self.assertGreater(recenterings, 0)
+
+    def test_unknown_frame(self):
+        with self.assertRaises(ValueError):
+            occupancy_grid_map.OccupancyGridMap({1: (0, 0, 0)}, {1: (0, 0, 0)}, 1, frame="moving")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+from ogm.canonical import ROTATIONS, canonical_key
+
+class TestOGMGoal(unittest.TestCase):
+
+    module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4), 4: (5, 5, 5)}
+
+    def test_rotation_group(self):
+        # 24 distinct proper rotations
+        self.assertEqual(len({r.tobytes() for r in ROTATIONS}), 24)
+        for r in ROTATIONS:
+            self.assertEqual(round(np.linalg.det(r)), 1)
+
+    def test_goal_reached_under_rotation_and_translation(self):
+        positions = np.array(list(self.module_positions.values()))
+        for r in ROTATIONS:
+            moved = (positions - positions[0]) @ r.T + np.array([7, -3, 2])
+            final_positions = {m: tuple(p) for m, p in zip(self.module_positions, moved)}
+            ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, final_positions, 4)
+            self.assertTrue(ogm.check_final())
+
+    def test_goal_requires_matching_modules(self):
+        # same shape, modules 3 and 4 swapped
+        final_positions = dict(self.module_positions)
+        final_positions[3], final_positions[4] = final_positions[4], final_positions[3]
+        ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, final_positions, 4)
+        self.assertFalse(ogm.check_final())
+
+    def test_mirror_image_is_not_a_rotation(self):
+        positions = np.array(list(self.module_positions.values()))
+        mirrored = positions * np.array([-1, 1, 1])
+        self.assertNotEqual(canonical_key(positions), canonical_key(mirrored))
+
+if __name__ == "__main__":
+    unittest.main()
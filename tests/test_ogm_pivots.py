@@ -7,20 +7,21 @@ class TestOGMPossibleActions(unittest.TestCase):
 
     def assert_possible_actions_match(self, module_positions, expected_actions):
         # Verify that the list of valid pivot actions for each module matches what's expected.
-        ogm = occupancy_grid_map.OccupancyGridMap(module_positions, module_positions, len(module_positions))
-        actual_actions = ogm.calc_possible_actions()
-        act = {}
-        for m in ogm.modules:
-            # Convert binary pivot array to list of action indices (1-indexed)
-            act[m] = set(np.where(actual_actions[m])[0] + 1)
-
-        expected_sets = {k : set(v) for k, v in expected_actions.items()}
-        
-        # Compare with expected action sets
-        self.assertEqual(
-            act, expected_sets,
-            msg=f"\nExpected: {expected_sets}\nActual:   {act}"
-        )
+        for backend in ("dense", "sparse", "bitboard"):
+            ogm = occupancy_grid_map.OccupancyGridMap(module_positions, module_positions, len(module_positions), backend=backend)
+            actual_actions = ogm.calc_possible_actions()
+            act = {}
+            for m in ogm.modules:
+                # Convert binary pivot array to list of action indices (1-indexed)
+                act[m] = set(np.where(actual_actions[m])[0] + 1)
+
+            expected_sets = {k : set(v) for k, v in expected_actions.items()}
+
+            # Compare with expected action sets
+            self.assertEqual(
+                act, expected_sets,
+                msg=f"\nBackend: {backend}\nExpected: {expected_sets}\nActual:   {act}"
+            )
 
     def is_articulation_point(self, module_id, module_positions):
         # Build undirected graph of modules based on adjacency
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+from ogm.pivot_cache import NEIGHBORHOOD_BITS, NEIGHBORHOOD_OFFSETS, PivotCache, legal_pivots, unpack_pivots
+from ogm.pivots import PIVOT_EXPECTED, PIVOT_OFFSETS, PIVOT_VALID
+
+class TestPivotCache(unittest.TestCase):
+
+    def test_masks_match_the_pivot_windows(self):
+        rng = np.random.RandomState(0)
+        occupied = rng.random_sample((200, NEIGHBORHOOD_BITS)) < 0.3
+        keys = occupied.astype(np.int64) @ (np.int64(1) << np.arange(NEIGHBORHOOD_BITS, dtype=np.int64))
+        masks = unpack_pivots(legal_pivots(keys))
+        for row, mask in zip(occupied, masks):
+            cells = {tuple(c) for c in NEIGHBORHOOD_OFFSETS[row].tolist()} | {(0, 0, 0)}
+            for p in range(48):
+                expected = all((tuple(c) in cells) == e for c, e, v in
+                               zip(PIVOT_OFFSETS[p].tolist(), PIVOT_EXPECTED[p], PIVOT_VALID[p]) if v)
+                self.assertEqual(mask[p], expected)
+
+    def test_lru_eviction_and_hit_rate(self):
+        cache = PivotCache(maxsize=2)
+        cache.masks([1, 2, 1])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.masks([1, 3])   # 1 becomes most recent, 2 is evicted
+        self.assertEqual(sorted(cache.entries), [1, 3])
+        self.assertEqual(cache.hit_rate, 2 / 5)
+        with self.assertRaises(ValueError):
+            PivotCache(maxsize=0)
+
+    def test_map_counts_lookups(self):
+        # a 3 module bar in the smallest dense grid, some windows stick out of it
+        positions = {1: (0, 0, 0), 2: (1, 0, 0), 3: (2, 0, 0)}
+        ogm = occupancy_grid_map.OccupancyGridMap(positions, positions, 3)
+        ogm.pivot_cache = PivotCache()
+        ogm.stats.reset()
+        mask = ogm.legal_action_mask(ogm.connectivity.articulation_points())
+        self.assertEqual(ogm.stats.counts["pivot_cache_misses"], 3)
+        # the middle module is an articulation point, the ends can move
+        self.assertFalse(mask[1].any())
+        self.assertTrue(mask[0].any() and mask[2].any())
+        ogm.legal_action_mask()
+        self.assertEqual(ogm.stats.counts["pivot_cache_hits"], 3)
+        self.assertEqual(ogm.pivot_cache.hit_rate, 0.5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+from ogm.pivots import PIVOT_DESTINATIONS, PIVOT_EXPECTED, PIVOT_OFFSETS, PIVOT_VALID
+
+class TestPivotTable(unittest.TestCase):
+
+    def test_table_is_shared_and_read_only(self):
+        a = occupancy_grid_map.OccupancyGridMap({1: (0, 0, 0)}, {1: (0, 0, 0)}, 1)
+        b = occupancy_grid_map.OccupancyGridMap({1: (0, 0, 0)}, {1: (0, 0, 0)}, 1, backend="sparse")
+        self.assertIs(a.pivot_offsets, b.pivot_offsets)
+        self.assertIs(a.pivot_destinations, PIVOT_DESTINATIONS)
+        with self.assertRaises(ValueError):
+            PIVOT_OFFSETS[0, 0, 0] = 1
+
+    def test_pivots_are_distinct_and_well_formed(self):
+        seen = set()
+        for p in range(48):
+            cells = {tuple(c): e for c, e, v in zip(PIVOT_OFFSETS[p], PIVOT_EXPECTED[p], PIVOT_VALID[p]) if v}
+            # the module itself is occupied, its destination is empty and one unit step away in two axes at most
+            self.assertTrue(cells[(0, 0, 0)])
+            self.assertFalse(cells[tuple(PIVOT_DESTINATIONS[p])])
+            self.assertIn(np.abs(PIVOT_DESTINATIONS[p]).sum(), (1, 2))
+            seen.add((frozenset(cells.items()), tuple(PIVOT_DESTINATIONS[p])))
+        self.assertEqual(len(seen), 48)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import unittest
+import numpy as np
+from agent.plan_shortcut import PlanShortcutter
+from agent.random_search_agent import RandomSearchAgent
+from ogm import occupancy_grid_map
+
+class TestPlanShortcutter(unittest.TestCase):
+
+    module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4), 4: (5, 5, 5)}
+    final_module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (4, 6, 4), 4: (4, 7, 4)}
+
+    def make_ogm(self):
+        return occupancy_grid_map.OccupancyGridMap(self.module_positions, self.final_module_positions, 4)
+
+    def test_random_plan_gets_shorter_and_still_reaches_the_goal(self):
+        agent = RandomSearchAgent(max_steps=3000, seed=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(agent.search(self.make_ogm()))
+
+        ogm = self.make_ogm()
+        start = ogm.get_state()
+        shortcutter = PlanShortcutter(window=4, max_nodes=100)
+        plan = shortcutter.optimize(ogm, agent.trajectory)
+        np.testing.assert_array_equal(ogm.get_state(), start)
+
+        self.assertLess(len(plan), len(agent.trajectory))
+        self.assertEqual(shortcutter.compression_ratio, len(agent.trajectory) / len(plan))
+        for module, action in plan:
+            self.assertTrue(ogm.legal_actions()[module - 1, action - 1])
+            ogm.take_action(module, action)
+        self.assertTrue(ogm.check_final())
+
+    def test_plan_off_the_goal_keeps_its_end(self):
+        ogm = self.make_ogm()
+        rng = np.random.RandomState(1)
+        plan = []
+        for _ in range(30):
+            m, p = np.nonzero(ogm.legal_actions())
+            i = rng.randint(len(m))
+            plan.append((int(m[i]) + 1, int(p[i]) + 1))
+            ogm.take_action(*plan[-1])
+        end = ogm.get_state()
+
+        ogm = self.make_ogm()
+        shorter = PlanShortcutter(window=4, max_nodes=50).optimize(ogm, plan)
+        self.assertLessEqual(len(shorter), len(plan))
+        for move in shorter:
+            ogm.take_action(*move)
+        np.testing.assert_array_equal(ogm.get_state(), end)
+
+    def test_rejects_illegal_plans(self):
+        with self.assertRaises(ValueError):
+            PlanShortcutter().optimize(self.make_ogm(), [(2, 1), (2, 1), (2, 1)])
+        with self.assertRaises(ValueError):
+            PlanShortcutter(window=1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+from ogm import occupancy_grid_map
+from agent.portfolio_search_agent import PortfolioSearchAgent
+from agent.random_search_agent import RandomSearchAgent
+
+class TestPortfolioSearchAgent(unittest.TestCase):
+
+    module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4), 4: (5, 5, 5)}
+    final_module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (4, 6, 4), 4: (4, 7, 4)}
+
+    def test_winner_is_reproducible_from_its_seed(self):
+        ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.final_module_positions, 4)
+        portfolio = PortfolioSearchAgent(num_searches=4, processes=2, max_steps=2000, seed=0)
+        self.assertTrue(portfolio.search(ogm))
+        self.assertTrue(ogm.check_final())
+        self.assertEqual(len(portfolio.worker_stats), 4)
+
+        ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.final_module_positions, 4)
+        single = RandomSearchAgent(max_steps=2000, seed=portfolio.winning_seed)
+        self.assertTrue(single.search(ogm))
+        self.assertEqual(single.trajectory, portfolio.trajectory)
+
+if __name__ == "__main__":
+    unittest.main()
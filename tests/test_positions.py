@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from ogm import occupancy_grid_map
+from ogm.positions import PositionView
+
+class TestPositions(unittest.TestCase):
+
+    module_positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4)}
+
+    def test_view_reads_and_writes_the_array(self):
+        array = np.array([[0, 0, 0], [1, 0, 0]], dtype=np.int32)
+        view = PositionView(array)
+        self.assertEqual(view, {1: (0, 0, 0), 2: (1, 0, 0)})
+        self.assertEqual(type(view[2][0]), int)
+        view[2] = (0, 1, 0)
+        self.assertEqual(array[1].tolist(), [0, 1, 0])
+        self.assertNotIn(3, view)
+        with self.assertRaises(KeyError):
+            view[0]
+        with self.assertRaises(TypeError):
+            del view[1]
+
+    def test_map_state_is_one_array(self):
+        ogm = occupancy_grid_map.OccupancyGridMap(self.module_positions, self.module_positions, 3)
+        self.assertEqual(ogm.positions.shape, (3, 3))
+        self.assertEqual(ogm.curr_grid_map.dtype, np.int16)
+        self.assertEqual(ogm.original_module_positions, self.module_positions)
+        self.assertEqual(ogm.module_positions[2], tuple(ogm.positions[1].tolist()))
+
+        # module 1 moves, recentering shifts the whole array back under the anchor
+        ogm.take_action(1, int(np.nonzero(ogm.legal_actions()[0])[0][0]) + 1)
+        self.assertEqual(ogm.module_positions[1], ogm.recenter_to)
+        self.assertEqual(ogm.edges, ogm.calculate_edges(list(ogm.modules), ogm.module_positions))
+
+        ogm.module_positions = dict(ogm.original_module_positions)
+        self.assertEqual(dict(ogm.module_positions), self.module_positions)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from ogm.scenarios import SHAPES, generate_scenarios, random_polycube, random_scenario, load_scenarios, save_scenarios
+
+FACE_STEPS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+
+
+def face_edges(cells):
+    occupied = set(cells)
+    return [(c, tuple(a + b for a, b in zip(c, s))) for c in cells for s in FACE_STEPS[::2]
+            if tuple(a + b for a, b in zip(c, s)) in occupied]
+
+
+def is_connected(cells):
+    occupied = set(cells)
+    seen = {cells[0]}
+    stack = [cells[0]]
+    while stack:
+        c = stack.pop()
+        for s in FACE_STEPS:
+            d = tuple(a + b for a, b in zip(c, s))
+            if d in occupied and d not in seen:
+                seen.add(d)
+                stack.append(d)
+    return len(seen) == len(occupied)
+
+
+class TestScenarios(unittest.TestCase):
+
+    def test_shapes_are_connected(self):
+        rng = np.random.default_rng(0)
+        for shape in SHAPES:
+            for n in (1, 2, 7, 60):
+                positions = random_polycube(n, shape, rng)
+                cells = list(positions.values())
+                self.assertEqual(sorted(positions), list(range(1, n + 1)))
+                self.assertEqual(len(set(cells)), n)
+                self.assertTrue(is_connected(cells), shape)
+                if shape == "line":
+                    self.assertEqual(sum(np.ptp(np.array(cells), axis=0)), n - 1)
+                if shape == "slab":
+                    self.assertIn(0, np.ptp(np.array(cells), axis=0))
+                if shape == "tree":
+                    self.assertEqual(len(face_edges(cells)), n - 1)
+
+    def test_seeded_generation_is_reproducible(self):
+        batch = generate_scenarios(5, 20, "tree", seed=3)
+        again = generate_scenarios(5, 20, "tree", seed=3)
+        for a, b in zip(batch, again):
+            self.assertEqual(a.start, b.start)
+            self.assertEqual(a.goal, b.goal)
+            single = random_scenario(20, "tree", a.seed)
+            self.assertEqual(a.start, single.start)
+            self.assertEqual(a.goal, single.goal)
+
+    def test_round_trip_and_load_into_ogm(self):
+        scenarios = generate_scenarios(4, [3, 8, 15, 30], ["line", "slab", "blob", "tree"], seed=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("scenarios.npz", "scenarios.jsonl"):
+                path = os.path.join(tmp, name)
+                save_scenarios(path, scenarios)
+                loaded = load_scenarios(path)
+                self.assertEqual(len(loaded), len(scenarios))
+                for a, b in zip(scenarios, loaded):
+                    self.assertEqual(a.start, b.start)
+                    self.assertEqual(a.goal, b.goal)
+                    self.assertEqual((a.shape, a.seed), (b.shape, b.seed))
+                    ogm = b.to_ogm(backend="sparse")
+                    self.assertEqual(len(ogm.modules), b.n)
+            with self.assertRaises(ValueError):
+                save_scenarios(os.path.join(tmp, "scenarios.txt"), scenarios)
+
+if __name__ == "__main__":
+    unittest.main()
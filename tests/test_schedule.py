@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+from ogm.connectivity import CSRGraph
+from ogm.scenarios import random_scenario
+from ogm.schedule import ParallelScheduler, schedule_moves
+
+class TestParallelScheduler(unittest.TestCase):
+
+    def random_plan(self, ogm, steps, seed):
+        rng = np.random.RandomState(seed)
+        start = ogm.get_state()
+        plan = []
+        for _ in range(steps):
+            m, p = np.nonzero(ogm.legal_actions())
+            i = rng.randint(len(m))
+            plan.append((int(m[i]) + 1, int(p[i]) + 1))
+            ogm.take_action(*plan[-1])
+        end = ogm.get_state()
+        ogm.set_state(start)
+        return plan, end
+
+    def test_rounds_run_in_any_order(self):
+        ogm = random_scenario(40, "slab", 0).to_ogm("sparse")
+        plan, end = self.random_plan(ogm, 150, 1)
+        scheduler = schedule_moves(ogm, plan)
+
+        self.assertEqual([move for r in scheduler.rounds for move in r], plan)
+        self.assertEqual(scheduler.makespan, len(scheduler.rounds))
+        self.assertGreater(scheduler.parallelism, 1.0)
+
+        for round_ in scheduler.rounds:
+            moving = [m for m, _ in round_]
+            self.assertEqual(len(set(moving)), len(moving))
+            rest = np.delete(ogm.get_state(), np.array(moving) - 1, axis=0)
+            self.assertTrue(CSRGraph.from_positions(rest).is_connected())
+            # every move stays legal whatever the order inside the round
+            start = ogm.get_state()
+            for order in (round_, round_[::-1]):
+                ogm.set_state(start)
+                for module, action in order:
+                    self.assertTrue(ogm.legal_actions()[module - 1, action - 1])
+                    ogm.take_action(module, action)
+        np.testing.assert_array_equal(ogm.get_state(), end)
+
+    def test_online_use_and_report(self):
+        positions = [(x, 0, 0) for x in range(12)]
+        scheduler = ParallelScheduler(positions)
+        # the two ends of a bar pivot independently, the same module twice cannot
+        self.assertEqual(scheduler.add(1, 6), 0)
+        self.assertEqual(scheduler.add(12, 14), 0)
+        self.assertEqual(scheduler.add(12, 2), 1)
+        self.assertEqual(scheduler.makespan, 2)
+        self.assertEqual(scheduler.finish(), [[(1, 6), (12, 14)], [(12, 2)]])
+        self.assertEqual(scheduler.parallelism, 1.5)
+        self.assertIn("3 moves in 2 rounds", scheduler.summary())
+
+if __name__ == "__main__":
+    unittest.main()
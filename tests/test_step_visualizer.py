@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+from PIL import Image
+from ogm import occupancy_grid_map
+from visualizer.step_visualizer import StepVisualizer, exposed_faces
+
+class TestStepVisualizer(unittest.TestCase):
+
+    def test_shared_faces_are_culled(self):
+        self.assertEqual(len(exposed_faces([(0, 0, 0)])), 6)
+        self.assertEqual(len(exposed_faces([(0, 0, 0), (1, 0, 0)])), 10)
+        # 2x2x2 block, every cube hides three faces
+        block = [(x, y, z) for x in range(2) for y in range(2) for z in range(2)]
+        self.assertEqual(len(exposed_faces(block)), 24)
+
+    def test_export_with_stride(self):
+        positions = {1: (4, 4, 4), 2: (4, 5, 4), 3: (5, 5, 4)}
+        ogm = occupancy_grid_map.OccupancyGridMap(positions, positions, 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            visualizer = StepVisualizer(ogm, output_path=os.path.join(tmp, "steps.gif"))
+            visualizer.frames = [list(ogm.module_positions.values())] * 7
+            path = visualizer.export(stride=3, processes=2, pause_frames=2, figsize=(2, 2), dpi=40)
+            with Image.open(path) as gif:
+                # frames 1, 4 and 7
+                self.assertEqual(gif.n_frames, 3)
+
+    def test_export_without_frames(self):
+        positions = {1: (4, 4, 4), 2: (4, 5, 4)}
+        ogm = occupancy_grid_map.OccupancyGridMap(positions, positions, 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            visualizer = StepVisualizer(ogm, output_path=os.path.join(tmp, "steps.gif"))
+            with self.assertRaises(ValueError):
+                visualizer.export()
+            self.assertFalse(os.path.exists(visualizer.output_path))
+
+if __name__ == "__main__":
+    unittest.main()
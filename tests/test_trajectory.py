@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from agent.greedy_agent import GreedyAgent
+from ogm import occupancy_grid_map
+from ogm.scenarios import random_scenario
+from ogm.trajectory import TrajectoryLog, TrajectoryRecorder
+
+class StateRecorder(TrajectoryRecorder):
+    """Recorder that also keeps the state after every logged step in memory."""
+
+    def __init__(self, path, ogm, **kwargs):
+        self.states = [ogm.get_state()]
+        super().__init__(path, ogm, **kwargs)
+
+    def record(self, module, action):
+        super().record(module, action)
+        self.states.append(self.ogm.get_state())
+
+    def reset(self):
+        super().reset()
+        self.states.append(self.ogm.get_state())
+
+class TestTrajectory(unittest.TestCase):
+
+    def test_random_access_replay(self):
+        scenario = random_scenario(8, "blob", seed=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.traj")
+            for frame in ("fixed", "relative"):
+                ogm = occupancy_grid_map.OccupancyGridMap(scenario.start, scenario.goal, 8, backend="sparse", frame=frame)
+                rng = np.random.default_rng(1)
+                states = [ogm.get_state()]
+                with TrajectoryRecorder(path, ogm, keyframe_interval=16, buffer_size=10) as recorder:
+                    ogm.recorder = recorder
+                    for _ in range(100):
+                        m, p = np.nonzero(ogm.legal_actions())
+                        i = rng.integers(len(m))
+                        ogm.take_action(int(m[i]) + 1, int(p[i]) + 1)
+                        states.append(ogm.get_state())
+                self.assertIsNone(ogm.recorder)
+
+                log = TrajectoryLog(path)
+                self.assertEqual(len(log), 100)
+                self.assertEqual(log.moves.dtype, np.int16)
+                for step in (0, 1, 15, 16, 17, 63, 100):
+                    np.testing.assert_array_equal(log.state_at(step), states[step])
+                for step, state in zip(range(3, 100, 7), log.states(3, 99, 7)):
+                    np.testing.assert_array_equal(state, states[step])
+
+                replayed = occupancy_grid_map.OccupancyGridMap(scenario.start, scenario.goal, 8, backend="sparse")
+                log.replay(replayed, 42)
+                np.testing.assert_array_equal(replayed.get_state(), states[42])
+                with self.assertRaises(IndexError):
+                    log.state_at(101)
+
+    def test_replay_across_greedy_restarts(self):
+        scenario = random_scenario(12, "blob", seed=0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.traj")
+            ogm = scenario.to_ogm("sparse")
+            agent = GreedyAgent(max_steps=150, restarts=3, patience=20, seed=0)
+            with StateRecorder(path, ogm, keyframe_interval=16, buffer_size=10) as recorder:
+                ogm.recorder = recorder
+                agent.search(ogm)
+            self.assertEqual(agent.restarts_used, 3)
+
+            log = TrajectoryLog(path)
+            self.assertEqual(len(log), len(recorder.states) - 1)
+            self.assertEqual(len(log), agent.steps_taken + agent.restarts_used)
+            for step, state in enumerate(recorder.states):
+                np.testing.assert_array_equal(log.state_at(step), state, err_msg=f"step {step}")
+            for step, state in zip(range(0, len(log), 5), log.states(0, stride=5)):
+                np.testing.assert_array_equal(state, recorder.states[step], err_msg=f"step {step}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,81 +1,142 @@
-# Re-import necessary packages after code execution environment reset
-import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-import matplotlib.animation as animation
-from IPython.display import HTML
-from matplotlib.animation import PillowWriter
-
-# Re-define StepVisualizer since environment was reset
-class StepVisualizer:
-    def __init__(self, ogm, output_path="random_search_steps.gif"):
-        self.ogm = ogm
-        self.output_path = output_path
-        self.frames = []
-
-    def capture_state(self):
-        """Capture current grid state as a list of module positions"""
-        module_positions = list(self.ogm.module_positions.values())
-        self.frames.append(module_positions.copy())
-
-    def draw_cube(self, ax, position, color='skyblue', alpha=0.9):
-        x, y, z = position
-        r = [0, 1]
-        vertices = np.array([[x+i, y+j, z+k] for i in r for j in r for k in r])
-        faces = [[vertices[j] for j in [0,1,3,2]],
-                 [vertices[j] for j in [4,5,7,6]],
-                 [vertices[j] for j in [0,1,5,4]],
-                 [vertices[j] for j in [2,3,7,6]],
-                 [vertices[j] for j in [1,3,7,5]],
-                 [vertices[j] for j in [0,2,6,4]]]
-        ax.add_collection3d(Poly3DCollection(faces, facecolors=color, linewidths=0.5, edgecolors='k', alpha=alpha))
-
-    ### Helpful to visualize in jupyter
-    def animate_inline(self):
-        fig = plt.figure(figsize=(6, 6))
-        ax = fig.add_subplot(111, projection='3d')
-    
-        def update(frame_idx):
-            ax.clear()
-            ax.set_xlim(0, self.ogm.grid_map.shape[0])
-            ax.set_ylim(0, self.ogm.grid_map.shape[1])
-            ax.set_zlim(0, self.ogm.grid_map.shape[2])
-            ax.set_xlabel("X")
-            ax.set_ylabel("Y")
-            ax.set_zlabel("Z")
-            ax.set_title(f"Step {frame_idx + 1}")
-    
-            for pos in self.frames[frame_idx]:
-                self.draw_cube(ax, pos)
-    
-        ani = animation.FuncAnimation(fig, update, frames=len(self.frames), interval=500)
-        return HTML(ani.to_jshtml())
-    
-    def animate(self, pause_frames=15):
-        fig = plt.figure(figsize=(6, 6))
-        ax = fig.add_subplot(111, projection='3d')
-
-        def update(frame_idx):
-            ax.clear()
-            ax.set_xlim(0, self.ogm.grid_map.shape[0])
-            ax.set_ylim(0, self.ogm.grid_map.shape[1])
-            ax.set_zlim(0, self.ogm.grid_map.shape[2])
-            ax.set_xlabel("X")
-            ax.set_ylabel("Y")
-            ax.set_zlabel("Z")
-
-            actual_idx = min(frame_idx, len(self.frames) - 1)
-            ax.set_title(f"Step {actual_idx + 1}")
-
-            for pos in self.frames[actual_idx]:
-                self.draw_cube(ax, pos)
-
-        total_frames = len(self.frames) + pause_frames
-        ani = animation.FuncAnimation(fig, update, frames=total_frames, interval=500)
-
-        writer = PillowWriter(fps=2, metadata={"loop": 0})
-        ani.save(self.output_path, writer=writer)
-        # ani.save(self.output_path, writer='pillow', loop=0)
-        plt.close(fig)
-        print(f"[✔] Animation saved to: {self.output_path}")
-        return self.output_path
\ No newline at end of file
+# Re-import necessary packages after code execution environment reset
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+import matplotlib.pyplot as plt
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+import matplotlib.animation as animation
+from IPython.display import HTML
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+from ogm.connectivity import FACE_STEPS
+from ogm.occupancy import pack_coords
+
+# corners of the unit cube face on each side, in the order of FACE_STEPS
+FACE_QUADS = np.array([[[1, 0, 0], [1, 1, 0], [1, 1, 1], [1, 0, 1]],
+                       [[0, 0, 0], [0, 1, 0], [0, 1, 1], [0, 0, 1]],
+                       [[0, 1, 0], [1, 1, 0], [1, 1, 1], [0, 1, 1]],
+                       [[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1]],
+                       [[0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]],
+                       [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]]])
+
+
+def exposed_faces(positions):
+    """(F, 4, 3) quads of every cube face not shared with a neighboring module"""
+    positions = np.asarray(positions, dtype=int).reshape(-1, 3)
+    neighbor_keys = pack_coords(positions[:, None, :] + FACE_STEPS)
+    exposed = ~np.isin(neighbor_keys, pack_coords(positions))
+    quads = positions[:, None, None, :] + FACE_QUADS[None]
+    return quads[exposed]
+
+
+def render_frame(task):
+    """Draw one frame to a PNG, module-level so it can run in a worker process"""
+    positions, limits, title, path, figsize, dpi = task
+    # a bare Figure on the Agg canvas, pyplot state is not shared with workers
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    ax.set_xlim(0, limits[0])
+    ax.set_ylim(0, limits[1])
+    ax.set_zlim(0, limits[2])
+    ax.set_xlabel("X")
+    ax.set_ylabel("Y")
+    ax.set_zlabel("Z")
+    ax.set_title(title)
+    ax.add_collection3d(Poly3DCollection(exposed_faces(positions), facecolors='skyblue', linewidths=0.5, edgecolors='k', alpha=0.9))
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+# Re-define StepVisualizer since environment was reset
+class StepVisualizer:
+    def __init__(self, ogm, output_path="random_search_steps.gif"):
+        self.ogm = ogm
+        self.output_path = output_path
+        self.frames = []
+
+    def capture_state(self):
+        """Capture current grid state as a list of module positions"""
+        # get_state is anchored on module 1, so frames line up in a relative frame too
+        module_positions = [tuple(int(c) for c in pos) for pos in self.ogm.get_state()]
+        self.frames.append(module_positions)
+
+    def load_trajectory(self, log, start=0, stop=None, stride=1):
+        """Replace the captured frames with every stride-th state of an ogm.trajectory.TrajectoryLog"""
+        self.frames = [[tuple(int(c) for c in pos) for pos in state] for state in log.states(start, stop, stride)]
+
+    ### Helpful to visualize in jupyter
+    def animate_inline(self):
+        fig = plt.figure(figsize=(6, 6))
+        ax = fig.add_subplot(111, projection='3d')
+    
+        def update(frame_idx):
+            ax.clear()
+            ax.set_xlim(0, self.ogm.grid_shape[0])
+            ax.set_ylim(0, self.ogm.grid_shape[1])
+            ax.set_zlim(0, self.ogm.grid_shape[2])
+            ax.set_xlabel("X")
+            ax.set_ylabel("Y")
+            ax.set_zlabel("Z")
+            ax.set_title(f"Step {frame_idx + 1}")
+    
+            ax.add_collection3d(Poly3DCollection(exposed_faces(self.frames[frame_idx]), facecolors='skyblue', linewidths=0.5, edgecolors='k', alpha=0.9))
+    
+        ani = animation.FuncAnimation(fig, update, frames=len(self.frames), interval=500)
+        return HTML(ani.to_jshtml())
+    
+    def animate(self, pause_frames=15, stride=1, processes=None):
+        return self.export(pause_frames=pause_frames, stride=stride, processes=processes)
+
+    def export(self, output_path=None, pause_frames=15, stride=1, fps=2, processes=None, figsize=(6, 6), dpi=100):
+        """Render the captured frames in a process pool and assemble them into a GIF or MP4.
+
+        Every frame is one merged face collection with the faces shared by
+        adjacent modules culled. Only every stride-th frame is drawn (the last
+        one always is), and the last frame is held for pause_frames extra
+        frame durations. MP4 output needs ffmpeg.
+        """
+        output_path = output_path or self.output_path
+        indices = list(range(0, len(self.frames), stride))
+        if indices and indices[-1] != len(self.frames) - 1:
+            indices.append(len(self.frames) - 1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tasks = [(self.frames[i], self.ogm.grid_shape, f"Step {i + 1}", os.path.join(tmp, f"frame_{k:06d}.png"), figsize, dpi)
+                     for k, i in enumerate(indices)]
+            if processes == 1 or len(tasks) <= 1:
+                paths = [render_frame(t) for t in tasks]
+            else:
+                with multiprocessing.Pool(processes) as pool:
+                    paths = pool.map(render_frame, tasks, chunksize=max(1, len(tasks) // (4 * (processes or os.cpu_count()))))
+
+            if output_path.endswith(".mp4"):
+                self._encode_mp4(tmp, output_path, fps, pause_frames)
+            else:
+                self._encode_gif(paths, output_path, fps, pause_frames)
+
+        print(f"[✔] Animation saved to: {output_path}")
+        return output_path
+
+    def _encode_gif(self, paths, output_path, fps, pause_frames):
+        if not paths:
+            raise ValueError("No frames to export, call capture_state or load_trajectory first")
+        images = [Image.open(p) for p in paths]
+        durations = [1000 / fps] * len(images)
+        durations[-1] *= 1 + pause_frames
+        images[0].save(output_path, save_all=True, append_images=images[1:], duration=durations, loop=0)
+        for image in images:
+            image.close()
+
+    def _encode_mp4(self, frame_dir, output_path, fps, pause_frames):
+        ffmpeg = shutil.which(plt.rcParams['animation.ffmpeg_path'])
+        if ffmpeg is None:
+            raise RuntimeError("MP4 export needs ffmpeg, set matplotlib's animation.ffmpeg_path or export a .gif")
+        # hold the last frame by padding the stream with its last picture
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-framerate", str(fps), "-i", os.path.join(frame_dir, "frame_%06d.png"),
+                        "-vf", f"tpad=stop_mode=clone:stop_duration={pause_frames / fps},pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                        "-pix_fmt", "yuv420p", output_path], check=True)